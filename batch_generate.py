@@ -0,0 +1,241 @@
+"""
+Generate many Sudoku puzzles at once, spread across a process pool.
+
+Each puzzle is written as one line of size * size characters, row by row, with 0 for an empty cell and letters
+for values above 9 (see Board.to_string).
+Puzzles are streamed to the output as they are produced.
+
+Every puzzle is generated from its own 64-bit seed (see puzzle_seed), so workers need no coordination and
+any puzzle can be regenerated from its seed alone:  generate_sudoku(size, removed, unique, grade, rng=seed).
+With --with-seeds each line starts with the puzzle's seed as 16 hex digits. With --archive the puzzles are
+streamed into a binary archive instead (see puzzle_archive.py). With --dedup, puzzles equivalent to one
+already written (the same up to symmetry, see sudoku_canonical.py) are skipped.
+
+Usage:  python batch_generate.py COUNT [--difficulty hard] [--grade hard] [--size 16] [--seed 1] [--processes 4]
+                                        [--output puzzles.txt] [--with-seeds] [--archive puzzles.sdka]
+                                        [--dedup [index.bin]]
+        python batch_generate.py COUNT --scaling    (report throughput for 1..N processes)
+"""
+import argparse
+import hashlib
+import multiprocessing
+import os
+import struct
+import sys
+import time
+
+from sudoku_generator import generate_sudoku
+from sudoku_grader import GRADE_NAMES
+from puzzle_archive import ArchiveWriter
+from sudoku_canonical import PuzzleIndex
+from constant import *
+
+DIFFICULTIES = {"easy": EASY, "medium": MEDIUM, "hard": HARD}
+
+
+def puzzle_seed(seed: int, index: int):
+    """
+    Derive the seed of one puzzle with BLAKE2b, which, unlike hash(), gives the same value on every Python version
+    and platform.
+
+    :param seed: Base seed of the run
+    :param index: Position of the puzzle in the run
+    :return: The 64-bit seed the puzzle is generated from
+    """
+    key = struct.pack("<QQ", seed & 0xFFFFFFFFFFFFFFFF, index)
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def _generate_chunk(task: tuple):
+    """
+    Worker function: generate one chunk of puzzles, each from its own seed.
+
+    :param task: (seed, first index, count, size, removed, unique, grade) for this chunk
+    :return: List of puzzles, each a Board
+    """
+    seed, first, count, size, removed, unique, grade = task
+    return [generate_sudoku(size, removed, unique, grade, puzzle_seed(seed, index))
+            for index in range(first, first + count)]
+
+
+def generate_batch(count: int, removed: int, seed: int = 0, processes: int = None,
+                   chunk_size: int = 16, unique: bool = True, grade: int = None, size: int = 9):
+    """
+    Generate puzzles across a process pool, yielding them as chunks complete.
+
+    Puzzle k is always generated from puzzle_seed(seed, k), so the same arguments produce the same puzzles in
+    the same order regardless of the number of processes and the chunk size.
+
+    :param count: Number of puzzles to generate
+    :param removed: Number of cells removed from each puzzle
+    :param seed: Base seed of the run
+    :param processes: Number of worker processes (defaults to the number of cores)
+    :param chunk_size: Number of puzzles generated per task
+    :param unique: Whether every puzzle must have a unique solution
+    :param grade: Technique grade every puzzle must have (see sudoku_grader.py), or None for any grade
+    :param size: Number of rows/columns of the boards (9, 16, 25, ...)
+    :return: Generator of puzzles, each a Board
+    """
+    tasks = []
+    for start in range(0, count, chunk_size):
+        tasks.append((seed, start, min(chunk_size, count - start), size, removed, unique, grade))
+    with multiprocessing.Pool(processes) as pool:
+        for chunk in pool.imap(_generate_chunk, tasks):
+            yield from chunk
+
+
+def write_batch(out, count: int, removed: int, seed: int, processes: int, unique: bool = True,
+                grade: int = None, size: int = 9, with_seeds: bool = False, index: PuzzleIndex = None):
+    """
+    Stream a batch of puzzles to a file object.
+
+    :param out: Writable text file object
+    :param count: Number of puzzles to generate
+    :param removed: Number of cells removed from each puzzle
+    :param seed: Base seed of the run
+    :param processes: Number of worker processes
+    :param unique: Whether every puzzle must have a unique solution
+    :param grade: Technique grade every puzzle must have, or None for any grade
+    :param size: Number of rows/columns of the boards
+    :param with_seeds: Whether to start each line with the puzzle's seed (16 hex digits and a space)
+    :param index: Optional PuzzleIndex; puzzles equivalent to one already in it are skipped
+    :return: Throughput in puzzles per second
+    """
+    start = time.perf_counter()
+    boards = generate_batch(count, removed, seed, processes, unique=unique, grade=grade, size=size)
+    for position, board in enumerate(boards):
+        if index is not None and not index.add(board):
+            continue
+        if with_seeds:
+            out.write(f"{puzzle_seed(seed, position):016x} ")
+        out.write(board.to_string() + "\n")
+    out.flush()
+    return count / (time.perf_counter() - start)
+
+
+def write_archive(path: str, count: int, removed: int, seed: int, processes: int, unique: bool = True,
+                  grade: int = None, size: int = 9, append: bool = False, index: PuzzleIndex = None):
+    """
+    Stream a batch of puzzles into a binary archive, with the seed of each puzzle.
+
+    :param path: Archive file to write
+    :param count: Number of puzzles to generate
+    :param removed: Number of cells removed from each puzzle
+    :param seed: Base seed of the run
+    :param processes: Number of worker processes
+    :param unique: Whether every puzzle must have a unique solution
+    :param grade: Technique grade every puzzle must have, or None for any grade
+    :param size: Number of rows/columns of the boards (at most 9)
+    :param append: Whether to add to an existing archive
+    :param index: Optional PuzzleIndex; puzzles equivalent to one already in it are skipped
+    :return: Throughput in puzzles per second
+    """
+    start = time.perf_counter()
+    with ArchiveWriter(path, size, append) as archive:
+        boards = generate_batch(count, removed, seed, processes, unique=unique, grade=grade, size=size)
+        for position, board in enumerate(boards):
+            if index is None or index.add(board):
+                archive.write(board, puzzle_seed(seed, position), removed, grade, unique)
+    return count / (time.perf_counter() - start)
+
+
+def report_scaling(count: int, removed: int, seed: int, max_processes: int, unique: bool = True,
+                   grade: int = None, size: int = 9):
+    """
+    Print throughput for 1..max_processes worker processes, discarding the puzzles.
+
+    :param count: Number of puzzles to generate per measurement
+    :param removed: Number of cells removed from each puzzle
+    :param seed: Base seed of the run
+    :param max_processes: Largest number of processes to measure
+    :param unique: Whether every puzzle must have a unique solution
+    :param grade: Technique grade every puzzle must have, or None for any grade
+    :param size: Number of rows/columns of the boards
+    """
+    baseline = None
+    with open(os.devnull, "w") as devnull:
+        for processes in range(1, max_processes + 1):
+            rate = write_batch(devnull, count, removed, seed, processes, unique, grade, size)
+            baseline = baseline or rate
+            print(f"{processes:3d} processes: {rate:10.1f} puzzles/s  ({rate / baseline:.2f}x)", file=sys.stderr)
+
+
+def _parse_difficulty(value: str):
+    """
+    Parse a difficulty given as a name (easy/medium/hard) or a number of removed cells.
+    """
+    if value.lower() in DIFFICULTIES:
+        return DIFFICULTIES[value.lower()]
+    return int(value)
+
+
+def _parse_grade(value: str):
+    """
+    Parse a technique grade given by name (easy/medium/hard/expert).
+    """
+    for grade, name in GRADE_NAMES.items():
+        if value.lower() == name:
+            return grade
+    raise argparse.ArgumentTypeError(f"unknown grade {value!r}")
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Generate Sudoku puzzles in bulk")
+    parser.add_argument("count", type=int, help="number of puzzles to generate")
+    parser.add_argument("--difficulty", type=_parse_difficulty, default=MEDIUM,
+                        help="easy, medium, hard or a number of cells to remove (default: medium)")
+    parser.add_argument("--size", type=int, default=9, help="rows/columns of the boards: 9, 16, 25, ... (default: 9)")
+    parser.add_argument("--seed", type=int, default=0, help="base seed, for reproducible runs")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--output", help="file to write puzzles to (default: stdout)")
+    parser.add_argument("--no-unique", dest="unique", action="store_false",
+                        help="allow puzzles with more than one solution")
+    parser.add_argument("--grade", type=_parse_grade, default=None,
+                        help="only keep puzzles whose hardest technique is easy, medium, hard or expert")
+    parser.add_argument("--with-seeds", action="store_true",
+                        help="start each line with the puzzle's 64-bit seed in hex, for regenerating it")
+    parser.add_argument("--archive", help="write a binary archive to this file instead of text")
+    parser.add_argument("--append", action="store_true",
+                        help="with --archive, add to an existing archive (use a new --seed)")
+    parser.add_argument("--dedup", nargs="?", const="", default=None, metavar="INDEX",
+                        help="skip puzzles equivalent to one already written; with a file, the index is kept "
+                             "there across runs")
+    parser.add_argument("--scaling", action="store_true",
+                        help="report throughput for 1..--processes processes instead of writing puzzles")
+    args = parser.parse_args(argv)
+
+    if args.scaling:
+        try:
+            report_scaling(args.count, args.difficulty, args.seed, args.processes, args.unique, args.grade,
+                           args.size)
+        except ValueError as error:
+            parser.error(str(error))
+        return
+
+    index = None
+    if args.dedup is not None:
+        index = PuzzleIndex(args.dedup or None)
+    known = len(index) if index is not None else 0
+    try:
+        if args.archive:
+            rate = write_archive(args.archive, args.count, args.difficulty, args.seed, args.processes, args.unique,
+                                 args.grade, args.size, args.append, index)
+        elif args.output:
+            with open(args.output, "w") as out:
+                rate = write_batch(out, args.count, args.difficulty, args.seed, args.processes, args.unique,
+                                   args.grade, args.size, args.with_seeds, index)
+        else:
+            rate = write_batch(sys.stdout, args.count, args.difficulty, args.seed, args.processes, args.unique,
+                               args.grade, args.size, args.with_seeds, index)
+    except ValueError as error:  # The --grade target cannot be reached with this many empty cells
+        parser.error(str(error))
+    print(f"{args.count} puzzles, {rate:.1f} puzzles/s with {args.processes} processes", file=sys.stderr)
+    if index is not None:
+        print(f"{args.count - (len(index) - known) - index.unchecked} duplicates skipped", file=sys.stderr)
+        if index.unchecked:
+            print(f"{index.unchecked} puzzles too symmetric to check for duplicates", file=sys.stderr)
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
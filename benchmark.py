@@ -0,0 +1,668 @@
+"""
+Benchmarks for the Sudoku generator and renderer.
+
+Run with:  python benchmark.py [--seconds N] [--count N] [--frames N]
+The rendering benchmark runs headless with the dummy SDL video driver and is skipped if pygame is missing.
+"""
+import argparse
+import itertools
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from sudoku_generator import SudokuGenerator, generate_sudoku
+from sudoku_solver import solve
+from sudoku_grader import grade, GRADE_NAMES
+from board import Board, UnitCounts
+from puzzle_archive import ArchiveWriter, PuzzleArchive
+from sudoku_symmetry import random_variant
+from sudoku_canonical import canonical_form, PuzzleIndex
+from game_session import GameSession
+from constant import *
+
+# Well-known hard puzzles (Arto Inkala's "world's hardest", Easter Monster and puzzles from Peter Norvig's
+# top95 list), used as the solver's worst-case corpus
+HARD_PUZZLES = (
+    "800000000003600000070090200050007000000045700000100030001000068008500010090000400",
+    "1.......2.9.4...5...6...7...5.9.3.......7.......85..4.7.....6...3...9.8...2.....1",
+    "4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......",
+    "52...6.........7.13...........4..8..6......5...........418.........3..2...87.....",
+    "6.....8.3.4.7.................5.4.7.3..2.....1.6.......2.....5.....8.6......1....",
+    "48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5....",
+    "....14....3....2...7..........9...3.6.1.............8.2.....1.4....5.6.....7.8...",
+)
+
+
+class RecursiveSudokuGenerator(SudokuGenerator):
+    """
+    Reference generator with the original recursive fill_remaining: one call per cell, candidates in fixed order.
+    Used as the "before" baseline for the iterative filler.
+    """
+    def fill_values(self):
+        self.fill_diagonal()
+        self.fill_remaining(0, self.box_length)
+        self.solution = self.board.copy()
+
+    def fill_remaining(self, row, col):
+        if (col >= self.row_length and row < self.row_length - 1):
+            row += 1
+            col = 0
+        if row >= self.row_length and col >= self.row_length:
+            return True
+        if row < self.box_length:
+            if col < self.box_length:
+                col = self.box_length
+        elif row < self.row_length - self.box_length:
+            if col == int(row // self.box_length * self.box_length):
+                col += self.box_length
+        else:
+            if col == self.row_length - self.box_length:
+                row += 1
+                col = 0
+                if row >= self.row_length:
+                    return True
+
+        for num in range(1, self.row_length + 1):
+            if self.is_valid(row, col, num):
+                self.place(row, col, num)
+                if self.fill_remaining(row, col + 1):
+                    return True
+                self.unplace(row, col)
+        return False
+
+
+class ScanSudokuGenerator(RecursiveSudokuGenerator):
+    """
+    Reference generator that checks validity by rescanning the board, like the original implementation.
+    Used as the "before" baseline for the bitmask engine.
+    """
+    def is_valid(self, row, col, num):
+        row_start = (row // self.box_length) * self.box_length
+        col_start = (col // self.box_length) * self.box_length
+        for i in range(self.row_length):
+            if self.board[row, i] == num or self.board[i, col] == num:
+                return False
+        for i in range(self.box_length):
+            for j in range(self.box_length):
+                if self.board[row_start + i, col_start + j] == num:
+                    return False
+        return True
+
+
+def boards_per_second(generator_class, seconds: float):
+    """
+    Generate full boards with the given generator class for roughly the given time.
+
+    :param generator_class: SudokuGenerator or a subclass of it
+    :param seconds: Wall-clock time budget for the measurement
+    :return: Number of boards generated per second
+    """
+    random.seed(0)
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        sudoku = generator_class(9, MEDIUM)
+        sudoku.fill_values()
+        sudoku.remove_cells()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def bench_generation(seconds: float):
+    """
+    Compare board generation throughput of the scanning and bitmask validity checks.
+
+    :param seconds: Time budget for each measurement
+    """
+    before = boards_per_second(ScanSudokuGenerator, seconds)
+    after = boards_per_second(SudokuGenerator, seconds)
+    print("generation (9x9, MEDIUM)")
+    print(f"  before (row/col/box scans): {before:10.1f} boards/s")
+    print(f"  after  (bitmasks):          {after:10.1f} boards/s")
+    print(f"  speedup:                    {after / before:10.2f}x")
+
+
+def bench_fill(count: int):
+    """
+    Compare the recursive and the iterative fill_remaining, and fill_remaining_mrv (used by fill_values), on full
+    9x9 boards.
+
+    :param count: Number of boards filled by each version
+    """
+    print("fill_remaining (9x9, after fill_diagonal)")
+    for name, generator_class, method in (("before (recursive)", RecursiveSudokuGenerator, "fill_remaining"),
+                                          ("after  (iterative)", SudokuGenerator, "fill_remaining"),
+                                          ("after  (MRV)      ", SudokuGenerator, "fill_remaining_mrv")):
+        random.seed(0)
+        times = []
+        for _ in range(count):
+            sudoku = generator_class(9, 0)
+            sudoku.fill_diagonal()
+            start = time.perf_counter()
+            if method == "fill_remaining":
+                sudoku.fill_remaining(0, sudoku.box_length)
+            else:
+                sudoku.fill_remaining_mrv()
+            times.append(time.perf_counter() - start)
+        times.sort()
+        print(f"  {name}: mean {sum(times) / count * 1000:7.3f} ms   p50 {times[count // 2] * 1000:7.3f} ms   "
+              f"p99 {times[count * 99 // 100] * 1000:7.2f} ms   max {times[-1] * 1000:7.2f} ms")
+
+
+def bench_sizes(count: int):
+    """
+    Measure generation time by board size: filling a full board, and a unique puzzle with half the cells removed.
+
+    :param count: Number of boards per size
+    """
+    random.seed(0)
+    print("generation by board size")
+    for size in (9, 16, 25):
+        fill_times = []
+        puzzle_times = []
+        for _ in range(count):
+            start = time.perf_counter()
+            SudokuGenerator(size, 0).fill_values()
+            fill_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            generate_sudoku(size, size * size // 2, unique=True)
+            puzzle_times.append(time.perf_counter() - start)
+        label = f"{size}x{size}"
+        print(f"  {label:<7} fill mean {sum(fill_times) / count * 1000:8.2f} ms  "
+              f"max {max(fill_times) * 1000:8.2f} ms   unique puzzle mean {sum(puzzle_times) / count * 1000:8.2f} ms  "
+              f"max {max(puzzle_times) * 1000:8.2f} ms")
+
+
+def bench_unique_removal(count: int):
+    """
+    Measure the time to produce a uniquely solvable puzzle at each difficulty.
+
+    :param count: Number of puzzles to generate per difficulty
+    """
+    random.seed(0)
+    print("unique puzzle generation (9x9)")
+    for name, removed in (("EASY", EASY), ("MEDIUM", MEDIUM), ("HARD", HARD)):
+        times = []
+        for _ in range(count):
+            start = time.perf_counter()
+            sudoku = SudokuGenerator(9, removed)
+            sudoku.fill_values()
+            sudoku.remove_cells(unique=True)
+            times.append(time.perf_counter() - start)
+        times.sort()
+        print(f"  {name:<6} mean {sum(times) / count * 1000:7.2f} ms   "
+              f"p50 {times[count // 2] * 1000:7.2f} ms   max {times[-1] * 1000:7.2f} ms")
+
+
+def bench_grading(count: int):
+    """
+    Measure the technique grader on generated puzzles and the cost of generating a puzzle of an exact grade.
+
+    :param count: Number of puzzles per difficulty
+    """
+    random.seed(0)
+    print("technique grading (9x9)")
+    for name, removed in (("EASY", EASY), ("MEDIUM", MEDIUM), ("HARD", HARD)):
+        puzzles = [generate_sudoku(9, removed, unique=True) for _ in range(count)]
+        grades = {}
+        start = time.perf_counter()
+        for puzzle in puzzles:
+            level = grade(puzzle)
+            grades[level] = grades.get(level, 0) + 1
+        elapsed = time.perf_counter() - start
+        spread = ", ".join(f"{GRADE_NAMES[level]} {grades[level]}" for level in sorted(grades))
+        print(f"  {name:<6} grade {elapsed / count * 1000:7.3f} ms/puzzle   by cell count -> {spread}")
+    for name, removed in (("EASY", EASY), ("MEDIUM", MEDIUM), ("HARD", HARD)):
+        times = []
+        for _ in range(count):
+            start = time.perf_counter()
+            generate_sudoku(9, removed, unique=True, grade=DIFFICULTY_GRADES[removed])
+            times.append(time.perf_counter() - start)
+        times.sort()
+        print(f"  {name:<6} graded generation mean {sum(times) / count * 1000:7.2f} ms   "
+              f"p50 {times[count // 2] * 1000:7.2f} ms   max {times[-1] * 1000:7.2f} ms")
+
+
+def bench_archive(count: int):
+    """
+    Measure the size of the binary archive and the speed of streaming writes and random mmap reads, against
+    the text format of batch_generate.
+
+    :param count: Number of puzzles in the archive
+    """
+    random.seed(0)
+    puzzles = [generate_sudoku(9, MEDIUM) for _ in range(count)]
+    print(f"puzzle archive ({count} puzzles)")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "puzzles.sdka")
+        start = time.perf_counter()
+        with ArchiveWriter(path) as archive:
+            for seed, puzzle in enumerate(puzzles):
+                archive.write(puzzle, seed, MEDIUM)
+        write_time = time.perf_counter() - start
+        size = os.path.getsize(path)
+        order = [random.randrange(count) for _ in range(count)]
+        start = time.perf_counter()
+        with PuzzleArchive(path) as archive:
+            for index in order:
+                archive.puzzle(index)
+        read_time = time.perf_counter() - start
+    print(f"  text:   {82:7.1f} bytes/puzzle")
+    print(f"  binary: {size / count:7.1f} bytes/puzzle   write {write_time / count * 1e6:6.2f} us/puzzle   "
+          f"random read {read_time / count * 1e6:6.2f} us/puzzle")
+
+
+def bench_validation(count: int):
+    """
+    Compare validating boards one at a time in Python with the NumPy batch validator.
+
+    :param count: Number of boards to validate
+    """
+    try:
+        import numpy as np
+        from batch_validate import validate
+    except ImportError:
+        print("batch validation: skipped (numpy is not installed)")
+        return
+
+    random.seed(0)
+    grids = [generate_sudoku(9, MEDIUM, with_solution=True)[1] for _ in range(100)]
+    boards = [grids[index % len(grids)] for index in range(count)]
+    start = time.perf_counter()
+    for board in boards:
+        UnitCounts(board).is_solved()
+    loop_time = time.perf_counter() - start
+    array = np.array([board.cells for board in boards], dtype=np.uint8).reshape(count, 9, 9)
+    start = time.perf_counter()
+    validate(array)
+    batch_time = time.perf_counter() - start
+    print(f"batch validation ({count} full 9x9 grids)")
+    print(f"  python loop: {loop_time / count * 1e6:8.2f} us/board")
+    print(f"  numpy:       {batch_time / count * 1e6:8.2f} us/board")
+
+
+def bench_symmetry(count: int):
+    """
+    Compare generating a graded unique puzzle with deriving a symmetric variant of one.
+
+    :param count: Number of puzzles per difficulty
+    """
+    random.seed(0)
+    print("symmetric variants (9x9, graded unique puzzles)")
+    for name, removed in (("EASY", EASY), ("MEDIUM", MEDIUM), ("HARD", HARD)):
+        start = time.perf_counter()
+        base = None
+        for _ in range(count):
+            base = generate_sudoku(9, removed, unique=True, grade=DIFFICULTY_GRADES[removed])
+        generate_time = (time.perf_counter() - start) / count
+        start = time.perf_counter()
+        for _ in range(count * 100):
+            generate_sudoku(9, removed, unique=True, grade=DIFFICULTY_GRADES[removed], base=base)
+        variant_time = (time.perf_counter() - start) / (count * 100)
+        print(f"  {name:<6} generate {generate_time * 1000:8.2f} ms   variant {variant_time * 1e6:7.2f} us   "
+              f"({generate_time / variant_time:,.0f}x)")
+
+
+def bench_canonical(count: int):
+    """
+    Measure canonicalization and duplicate detection throughput on generated puzzles.
+
+    :param count: Number of puzzles per difficulty
+    """
+    random.seed(0)
+    print("canonical form (9x9)")
+    for name, removed in (("EASY", EASY), ("MEDIUM", MEDIUM), ("HARD", HARD)):
+        puzzles = [generate_sudoku(9, removed, unique=True) for _ in range(count)]
+        puzzles += [random_variant(puzzle) for puzzle in puzzles]  # Every puzzle twice, up to symmetry
+        index = PuzzleIndex()
+        start = time.perf_counter()
+        duplicates = sum(not index.add(puzzle) for puzzle in puzzles)
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<6} {len(puzzles) / elapsed:8.0f} puzzles/s   "
+              f"{duplicates} of {len(puzzles)} found as duplicates")
+
+
+def _line_orders(box_size: int):
+    """
+    :return: Every order of the rows (or columns) that keeps each band (or stack) together
+    """
+    orders = []
+    for bands in itertools.permutations(range(box_size)):
+        lines = [itertools.permutations(range(band * box_size, (band + 1) * box_size)) for band in bands]
+        orders += [[line for part in parts for line in part] for parts in itertools.product(*lines)]
+    return orders
+
+
+def _brute_force_canonical(board: Board):
+    """
+    Canonical form by trying every symmetry of the board, as sudoku_canonical.py defines it: the smallest pattern
+    of givens row by row (empty cells first), then the smallest digits column by column, relabeled in order of
+    first appearance. Only practical for 4x4 boards (2 * 8 * 8 orderings).
+    """
+    size = board.size
+    best = None
+    for transpose in (False, True):
+        for rows in _line_orders(board.box_size):
+            for cols in _line_orders(board.box_size):
+                if transpose:
+                    cells = [board.cells[cols[col] * size + rows[row]] for row in range(size) for col in range(size)]
+                else:
+                    cells = [board.cells[rows[row] * size + cols[col]] for row in range(size) for col in range(size)]
+                labels = {0: 0}
+                for col in range(size):
+                    for row in range(size):
+                        labels.setdefault(cells[row * size + col], len(labels))
+                pattern = [bool(num) for num in cells]
+                digits = [labels[cells[row * size + col]] for col in range(size) for row in range(size)]
+                key = (pattern, digits)
+                if best is None or key < best[0]:
+                    best = (key, bytes(labels[num] for num in cells))
+    return best[1]
+
+
+def check_canonical(count: int):
+    """
+    Check canonical_form against a brute force over every symmetry of 4x4 boards, from full grids to empty
+    boards, and check that it finds the 9x9 full grids and their variants equal.
+
+    :param count: Number of boards per number of empty cells
+    """
+    random.seed(0)
+    print("canonical form check")
+    checked = 0
+    for removed in range(17):
+        for _ in range(count):
+            board = generate_sudoku(4, removed)
+            assert canonical_form(board) == _brute_force_canonical(board), board.to_string()
+            checked += 1
+    print(f"  4x4 brute force: {checked} boards with 0 to 16 empty cells, all minimal")
+    grids = [generate_sudoku(9, 0) for _ in range(max(1, count // 10))]
+    start = time.perf_counter()
+    for grid in grids:
+        assert canonical_form(grid) == canonical_form(random_variant(grid))
+    elapsed = (time.perf_counter() - start) / (2 * len(grids))
+    print(f"  9x9 full grids:  {len(grids)} grids equal to a random variant, {elapsed * 1000:.1f} ms/grid")
+
+
+def bench_solver(count: int):
+    """
+    Measure solve time on generated puzzles of each difficulty and on the hard corpus.
+
+    :param count: Number of generated puzzles per difficulty
+    """
+    random.seed(0)
+    print("solver (9x9)")
+    corpora = [(name, [generate_sudoku(9, removed, unique=True) for _ in range(count)])
+               for name, removed in (("EASY", EASY), ("MEDIUM", MEDIUM), ("HARD", HARD))]
+    corpora.append(("hard corpus", [Board.from_string(text) for text in HARD_PUZZLES]))
+    for name, puzzles in corpora:
+        times = []
+        for puzzle in puzzles:
+            start = time.perf_counter()
+            solve(puzzle)
+            times.append(time.perf_counter() - start)
+        times.sort()
+        print(f"  {name:<11} mean {sum(times) / len(times) * 1000:7.3f} ms   "
+              f"p50 {times[len(times) // 2] * 1000:7.3f} ms   max {times[-1] * 1000:7.3f} ms")
+
+
+def bench_session(count: int):
+    """
+    Measure the cold import time of the headless game core and the speed of its move API.
+
+    :param count: Number of sessions to play through
+    """
+    code = "import time; t = time.perf_counter(); import game_session; print(time.perf_counter() - t)"
+    import_time = float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).stdout)
+    random.seed(0)
+    puzzles = [SudokuGenerator(9, MEDIUM) for _ in range(count)]
+    for sudoku in puzzles:
+        sudoku.fill_values()
+        sudoku.remove_cells()
+    moves = 0
+    start = time.perf_counter()
+    for sudoku in puzzles:
+        session = GameSession(sudoku.get_board().copy(), sudoku.get_solution())
+        for row in range(BOARD_ROWS):
+            for col in range(BOARD_COLS):
+                session.select(row, col)
+                session.set_temp(1 + (row + col) % 9)
+                session.commit()
+                moves += 3
+        session.status()
+        session.reset()
+    elapsed = time.perf_counter() - start
+    print("headless game core")
+    print(f"  import game_session (cold): {import_time * 1000:10.2f} ms")
+    print(f"  moves:                      {moves / elapsed:10.0f} moves/s")
+
+
+def bench_frame_time(frames: int):
+    """
+    Compare full-frame draw time with per-draw font loading against the glyph cache, headless.
+
+    :param frames: Number of frames to draw per measurement
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    try:
+        import pygame
+        from sudokuGame import SudokuGame
+    except ImportError:
+        print("frame time: skipped (pygame is not installed)")
+        return
+
+    class UncachedSudokuGame(SudokuGame):
+        # Loads a font and renders text on every draw, like the original renderer
+        def _draw_number(self, number, row, col, num_color):
+            num_surf = pygame.font.Font(None, NUM_FONT).render(str(number), True, num_color)
+            center = (col * SQUARE_SIZE + EDGE_BLANK + SQUARE_SIZE / 2,
+                      row * SQUARE_SIZE + EDGE_BLANK + SQUARE_SIZE / 2)
+            self.screen.blit(num_surf, num_surf.get_rect(center=center))
+
+        def _draw_text(self, font, text, text_center):
+            text_surf = pygame.font.Font(None, font).render(text, False, TEXT_COLOR)
+            self.screen.blit(text_surf, text_surf.get_rect(center=text_center))
+
+    random.seed(0)
+    print(f"frame time (headless, {frames} frames)")
+    results = []
+    for label, game_class in (("before (font per draw)", UncachedSudokuGame), ("after  (glyph cache)", SudokuGame)):
+        game = game_class(EASY)
+        game._update_screen()  # Warm up the cache
+        start = time.perf_counter()
+        for _ in range(frames):
+            game.full_redraw = True
+            game._update_screen()
+        results.append((time.perf_counter() - start) / frames)
+        print(f"  {label + ':':<27} {results[-1] * 1000:10.3f} ms/frame")
+    print(f"  speedup:                    {results[0] / results[1]:10.2f}x")
+
+    # A typical input event only touches the previously and newly selected cells
+    start = time.perf_counter()
+    for frame in range(frames):
+        game.session.changed_cells.add((frame % BOARD_ROWS, 0))
+        game.session.changed_cells.add((frame % BOARD_ROWS, 1))
+        game._update_screen()
+    print(f"  two dirty cells:            {(time.perf_counter() - start) / frames * 1000:10.3f} ms/frame")
+    start = time.perf_counter()
+    for _ in range(frames):
+        game._update_screen()
+    print(f"  idle (nothing changed):     {(time.perf_counter() - start) / frames * 1000:10.3f} ms/frame")
+
+
+def bench_pencil_marks(frames: int):
+    """
+    Compare recomputing every cell's candidates after each move with the incremental pencil marks, and measure
+    the frame time of the candidates overlay, headless.
+
+    :param frames: Number of moves (and frames) per measurement
+    """
+    random.seed(0)
+    puzzle, solution = generate_sudoku(9, HARD, unique=True, grade=GRADE_HARD, with_solution=True)
+    empty = [(row, col) for row in range(9) for col in range(9) if puzzle[row, col] == 0]
+    print(f"pencil marks ({frames} moves)")
+    session = GameSession(puzzle, solution)
+    session.track_candidates(True)
+    marks = session.pencil_marks
+    results = []
+    for label in ("before (all cells per move)", "after  (cell and peers)"):
+        start = time.perf_counter()
+        for move in range(frames):
+            row, col = empty[move % len(empty)]
+            num = solution[row, col] if move // len(empty) % 2 == 0 else 0  # Fill every empty cell, then clear
+            session.answer_counts.set(row, col, num)
+            if label.startswith("before"):
+                marks.recompute()
+            else:
+                marks.update(row, col)
+        results.append((time.perf_counter() - start) / frames)
+        print(f"  {label + ':':<30} {results[-1] * 1e6:8.2f} us/move")
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    try:
+        from sudokuGame import SudokuGame
+    except ImportError:
+        print("  overlay frame time: skipped (pygame is not installed)")
+        return
+    for label, show in (("overlay off", False), ("overlay on", True)):
+        game = SudokuGame(HARD, session=GameSession(puzzle, solution), show_candidates=show)
+        game._update_screen()
+        start = time.perf_counter()
+        for _ in range(frames // 10):
+            game.full_redraw = True
+            game._update_screen()
+        full_frame = (time.perf_counter() - start) / (frames // 10)
+        start = time.perf_counter()
+        for move in range(frames):
+            row, col = empty[move % len(empty)]
+            game.session.select(row, col)
+            game.session.set_temp(solution[row, col])
+            game.session.commit()
+            game._update_screen()
+            game.session.erase()
+            game._update_screen()
+        move_frame = (time.perf_counter() - start) / (2 * frames)
+        print(f"  {label + ':':<30} {full_frame * 1000:8.3f} ms/full frame   {move_frame * 1000:8.3f} ms/move frame")
+
+
+def bench_transitions(count: int):
+    """
+    Measure cold start (imports) and screen-transition latency, recreating the window for every screen as the
+    game used to against the shared AppContext, headless.
+
+    :param count: Number of start -> game -> game-over rounds per measurement
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    try:
+        import pygame
+        from sudokuGame import AppContext, DisplayStartOver, SudokuGame
+    except ImportError:
+        print("screen transitions: skipped (pygame is not installed)")
+        return
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    imports = {}
+    for module in ("main", "sudokuGame"):
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=directory).stdout
+        imports[module] = float(output.split()[-1])  # pygame prints a banner first
+    random.seed(0)
+    games = [generate_sudoku(9, EASY, unique=True, grade=GRADE_EASY, with_solution=True) for _ in range(count)]
+    click_easy = pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1,
+                                    pos=(SCREEN_WIDTH // 2 - 200, SCREEN_HEIGHT - 175))
+    press_r = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_r)
+
+    def play_rounds(new_window: bool):
+        # Time each screen from its creation until it has been drawn and has handled one input event
+        shared = AppContext()
+        to_game, to_end, to_start = [], [], []
+        for puzzle, solution in games:
+            start = time.perf_counter()
+            game = SudokuGame(EASY, session=GameSession(puzzle, solution), app=AppContext() if new_window else shared)
+            game._update_screen()
+            to_game.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            pygame.event.post(press_r)
+            DisplayStartOver(AppContext() if new_window else shared).draw_game_over(GAME_WIN)
+            to_end.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            pygame.event.post(click_easy)
+            DisplayStartOver(AppContext() if new_window else shared).draw_game_start()
+            to_start.append(time.perf_counter() - start)
+        return [sorted(times)[len(times) // 2] * 1000 for times in (to_game, to_end, to_start)]
+
+    print("screen transitions (headless; median ms until drawn and one event handled)")
+    print(f"  import main (no pygame):    {imports['main'] * 1000:8.1f} ms")
+    print(f"  import sudokuGame (pygame): {imports['sudokuGame'] * 1000:8.1f} ms")
+    for name, new_window in (("before (window per screen)", True), ("after  (AppContext)", False)):
+        to_game, to_end, to_start = play_rounds(new_window)
+        print(f"  {name:27} start->game {to_game:6.2f}   game->end {to_end:6.2f}   end->start {to_start:6.2f}")
+
+
+def bench_idle_cpu(seconds: float):
+    """
+    Compare CPU use of an idle game screen between a polling loop and the blocking EventLoop, headless.
+
+    :param seconds: Time to leave each loop idle
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    try:
+        import pygame
+        from sudokuGame import SudokuGame
+    except ImportError:
+        print("idle CPU: skipped (pygame is not installed)")
+        return
+
+    random.seed(0)
+    game = SudokuGame(EASY)
+    print(f"idle CPU (headless, {seconds:.1f} s per loop)")
+
+    # Before: poll for events and redraw the whole screen on every pass
+    start, cpu_start = time.perf_counter(), time.process_time()
+    while time.perf_counter() - start < seconds:
+        pygame.event.get()
+        game.full_redraw = True
+        game._update_screen()
+        game.session.status()
+    wall, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+    print(f"  before (polling loop):      {cpu / wall * 100:9.1f} % CPU")
+
+    # After: the game's own loop, stopped from the update callback once the time is up
+    def update():
+        game._update_screen()
+        game.session.status()
+        return True if time.perf_counter() - start >= seconds else None
+
+    start, cpu_start = time.perf_counter(), time.process_time()
+    game.loop.run(lambda event: None, update)
+    wall, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+    print(f"  after  (EventLoop):         {cpu / wall * 100:9.1f} % CPU   ({game.loop.fps:.1f} loop passes/s)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sudoku benchmarks")
+    parser.add_argument("--seconds", type=float, default=2.0, help="time budget per measurement")
+    parser.add_argument("--count", type=int, default=100, help="puzzles per difficulty for per-puzzle timings")
+    parser.add_argument("--frames", type=int, default=200, help="frames drawn by the rendering benchmark")
+    args = parser.parse_args()
+    bench_generation(args.seconds)
+    bench_fill(args.count * 5)
+    bench_unique_removal(args.count)
+    bench_sizes(max(1, args.count // 10))
+    bench_solver(args.count)
+    bench_grading(args.count)
+    bench_symmetry(max(1, args.count // 10))
+    bench_canonical(args.count)
+    check_canonical(max(1, args.count // 10))
+    bench_session(args.count)
+    bench_archive(args.count * 10)
+    bench_validation(args.count * 100)
+    bench_frame_time(args.frames)
+    bench_pencil_marks(args.count * 10)
+    bench_transitions(max(1, args.count // 10))
+    bench_idle_cpu(args.seconds)
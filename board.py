@@ -0,0 +1,283 @@
+import math
+
+# Characters used for cell values in strings; values above 9 are written as letters (A = 10, ..., P = 25)
+DIGITS = "0123456789ABCDEFGHIJKLMNOP"
+
+
+_units_cache = {}
+_peers_cache = {}
+
+
+def unit_tables(size: int):
+    """
+    Precompute the unit structure of a size x size board, shared by the solver, the grader and the pencil marks.
+
+    :param size: Number of rows/columns
+    :return: (row of each cell, column of each cell, box of each cell, list of units as lists of cells: the
+             rows, then the columns, then the boxes)
+    """
+    units = _units_cache.get(size)
+    if units is None:
+        box_size = math.isqrt(size)
+        rows = [cell // size for cell in range(size * size)]
+        cols = [cell % size for cell in range(size * size)]
+        boxes = [(row // box_size) * box_size + col // box_size for row, col in zip(rows, cols)]
+        cell_units = [[cell for cell in range(size * size) if rows[cell] == unit] for unit in range(size)]
+        cell_units += [[cell for cell in range(size * size) if cols[cell] == unit] for unit in range(size)]
+        cell_units += [[cell for cell in range(size * size) if boxes[cell] == unit] for unit in range(size)]
+        units = _units_cache[size] = (rows, cols, boxes, cell_units)
+    return units
+
+
+def peer_lists(size: int):
+    """
+    :param size: Number of rows/columns
+    :return: For each cell, the sorted list of the other cells sharing a row, column or box with it
+    """
+    peers = _peers_cache.get(size)
+    if peers is None:
+        units = unit_tables(size)[3]
+        peers = [sorted({other for unit in units if cell in unit for other in unit} - {cell})
+                 for cell in range(size * size)]
+        _peers_cache[size] = peers
+    return peers
+
+
+class Board:
+    """
+    A Sudoku board stored as one flat bytearray of size * size cells, row by row, with 0 for an empty cell.
+
+    Cells are addressed as board[row, col]. Rows, columns and boxes are available as memoryview slices of
+    the underlying bytes, so reading a unit never copies the board.
+    """
+    __slots__ = ("size", "box_size", "cells")
+
+    def __init__(self, size: int = 9, cells=None):
+        """
+        Initialize a board.
+
+        :param size: Number of rows/columns of the board
+        :param cells: Optional initial cell values (any iterable of ints, row by row); empty board if omitted
+        """
+        self.size = size
+        self.box_size = math.isqrt(size)
+        self.cells = bytearray(size * size) if cells is None else bytearray(cells)
+        if len(self.cells) != size * size:
+            raise ValueError(f"expected {size * size} cells, got {len(self.cells)}")
+
+    @classmethod
+    def from_rows(cls, rows: list):
+        """
+        Build a board from a 2D list.
+
+        :param rows: List of rows, each a list of ints
+        :return: A new Board
+        """
+        return cls(len(rows), [num for row in rows for num in row])
+
+    @classmethod
+    def from_string(cls, text: str):
+        """
+        Build a board from a string of digits, row by row, with 0 or '.' for an empty cell. Values above 9
+        are letters (A = 10), as written by to_string().
+
+        :param text: String of size * size characters (surrounding whitespace is ignored)
+        :return: A new Board
+        """
+        text = text.strip()
+        return cls(math.isqrt(len(text)), [0 if char == "." else DIGITS.index(char.upper()) for char in text])
+
+    def to_string(self):
+        """
+        Convert the board to a string of digits, row by row, with 0 for an empty cell and letters for values
+        above 9 (A = 10).
+
+        :return: String of size * size characters
+        """
+        return "".join([DIGITS[num] for num in self.cells])
+
+    def to_rows(self):
+        """
+        Convert the board to a 2D list.
+
+        :return: List of rows, each a list of ints
+        """
+        return [list(self.row(row)) for row in range(self.size)]
+
+    def __getitem__(self, position: tuple):
+        row, col = position
+        return self.cells[row * self.size + col]
+
+    def __setitem__(self, position: tuple, num: int):
+        row, col = position
+        self.cells[row * self.size + col] = num
+
+    def __iter__(self):
+        # Iterate over rows, like a 2D list
+        for row in range(self.size):
+            yield self.row(row)
+
+    def __eq__(self, other):
+        return isinstance(other, Board) and self.cells == other.cells
+
+    def __repr__(self):
+        return f"Board({self.size}, {bytes(self.cells)!r})"
+
+    def row(self, row: int):
+        """
+        :param row: Row index
+        :return: Read/write memoryview of the cells in the row
+        """
+        return memoryview(self.cells)[row * self.size:(row + 1) * self.size]
+
+    def column(self, col: int):
+        """
+        :param col: Column index
+        :return: Read/write memoryview of the cells in the column
+        """
+        return memoryview(self.cells)[col::self.size]
+
+    def box(self, box: int):
+        """
+        :param box: Box index, counting boxes left to right, top to bottom
+        :return: Tuple of memoryviews, one per row segment of the box
+        """
+        view = memoryview(self.cells)
+        start = (box // self.box_size) * self.box_size * self.size + (box % self.box_size) * self.box_size
+        return tuple(view[start + i * self.size:start + i * self.size + self.box_size] for i in range(self.box_size))
+
+    def copy(self):
+        """
+        :return: A new Board with the same cells
+        """
+        return Board(self.size, self.cells)
+
+    def snapshot(self):
+        """
+        Take an immutable copy of the cells that can later be passed to restore().
+
+        :return: bytes of the cells
+        """
+        return bytes(self.cells)
+
+    def restore(self, snapshot):
+        """
+        Overwrite every cell in place from a snapshot (or another board's cells).
+
+        :param snapshot: bytes-like object of size * size cell values
+        """
+        self.cells[:] = snapshot
+
+    def clear(self):
+        """
+        Set every cell to 0 in place.
+        """
+        self.cells[:] = bytes(len(self.cells))
+
+    def count_empty(self):
+        """
+        :return: Number of empty (0) cells
+        """
+        return self.cells.count(0)
+
+
+class UnitCounts:
+    """
+    Per-row, per-column and per-box digit counts of a Board, plus its number of empty cells.
+
+    Writing cells through set() keeps the counts up to date in O(1), so fullness, win and conflict checks
+    never rescan the board. The counts of each kind of unit are stored in one bytearray, (size + 1) bytes
+    per unit, indexed by unit * (size + 1) + digit.
+    """
+    __slots__ = ("board", "row_counts", "col_counts", "box_counts", "empty", "conflicts")
+
+    def __init__(self, board: Board):
+        """
+        :param board: The board to track. Once tracked, cells should only be written through set()
+        """
+        self.board = board
+        self.recount()
+
+    def recount(self):
+        """
+        Rebuild every count from the board, e.g. after the board was restored from a snapshot.
+        """
+        size = self.board.size
+        self.row_counts = bytearray(size * (size + 1))
+        self.col_counts = bytearray(size * (size + 1))
+        self.box_counts = bytearray(size * (size + 1))
+        self.empty = size * size
+        self.conflicts = 0  # Number of (unit, digit) pairs where the digit appears more than once
+        for row in range(size):
+            for col in range(size):
+                num = self.board[row, col]
+                if num != 0:
+                    self.board[row, col] = 0
+                    self.set(row, col, num)
+
+    def box_index(self, row: int, col: int):
+        """
+        :return: Index of the box containing (row, col), counting boxes left to right, top to bottom
+        """
+        box_size = self.board.box_size
+        return (row // box_size) * box_size + col // box_size
+
+    def set(self, row: int, col: int, num: int):
+        """
+        Write num (0 to clear) into the cell and update the counts.
+
+        :param row: The row index of the cell
+        :param col: The column index of the cell
+        :param num: The new value of the cell
+        """
+        old = self.board[row, col]
+        if old == num:
+            return
+        stride = self.board.size + 1
+        row_base = row * stride
+        col_base = col * stride
+        box_base = self.box_index(row, col) * stride
+        if old != 0:
+            self._remove(self.row_counts, row_base + old)
+            self._remove(self.col_counts, col_base + old)
+            self._remove(self.box_counts, box_base + old)
+            self.empty += 1
+        if num != 0:
+            self._add(self.row_counts, row_base + num)
+            self._add(self.col_counts, col_base + num)
+            self._add(self.box_counts, box_base + num)
+            self.empty -= 1
+        self.board[row, col] = num
+
+    def _add(self, counts: bytearray, index: int):
+        counts[index] += 1
+        if counts[index] == 2:
+            self.conflicts += 1
+
+    def _remove(self, counts: bytearray, index: int):
+        counts[index] -= 1
+        if counts[index] == 1:
+            self.conflicts -= 1
+
+    def is_full(self):
+        """
+        :return: True if no cell is empty
+        """
+        return self.empty == 0
+
+    def is_solved(self):
+        """
+        :return: True if no cell is empty and no row, column or box has a repeated digit
+        """
+        return self.empty == 0 and self.conflicts == 0
+
+    def has_conflict(self, row: int, col: int):
+        """
+        :return: True if the value of the cell is repeated in its row, column or box
+        """
+        num = self.board[row, col]
+        if num == 0:
+            return False
+        stride = self.board.size + 1
+        return (self.row_counts[row * stride + num] > 1 or self.col_counts[col * stride + num] > 1 or
+                self.box_counts[self.box_index(row, col) * stride + num] > 1)
@@ -21,9 +21,13 @@ NUM_COLOR_BLUE = (0, 0, 255)  # Color of answer number
 CELL_SELECTED_COLOR = (255, 0, 0)
 BUTTON_COLOR = (255, 128, 0)  # All button number
 TEXT_COLOR = (0, 0, 0)  # Text color in button/start screen/end screen
+CONFLICT_CELL_COLOR = (255, 200, 200)  # Background of cells whose number is repeated in a row/column/box
+WRONG_CELL_COLOR = (255, 170, 120)  # Background of cells whose committed number differs from the solution
+PENCIL_MARK_COLOR = (110, 110, 110)  # Color of candidate digits
 
 # Font
 NUM_FONT = 50  # Font for numbers in cell
+PENCIL_MARK_FONT = 24  # Font for candidate digits, drawn in a 3x3 grid inside a cell
 GAME_START_FONT = 80
 DIFFICULTY_FONT = 50
 GAME_OVER_FONT = 80
@@ -31,12 +35,40 @@ GAME_RESTART_FONT = 40
 GAME_EXIT_FONT = 40
 BUTTON_FONT = 30
 
+# Main loop
+MAX_FPS = 60  # Upper bound on redraws per second
+IDLE_TIMEOUT = 250  # Longest time (ms) to block waiting for input before running the loop again
+
+# Highlight numbers repeated in a row, column or box while playing
+SHOW_CONFLICTS = False
+# Highlight committed numbers that differ from the solution as soon as they are entered
+SHOW_ERRORS = False
+# Show the candidates (pencil marks) of every empty cell; C toggles them while playing
+SHOW_CANDIDATES = False
+
 # Difficulty
 EASY = 30
 MEDIUM = 40
 HARD = 50
 
+# Difficulty grades: the hardest solving technique a puzzle needs (see sudoku_grader.py)
+GRADE_EASY = 1  # Hidden singles only
+GRADE_MEDIUM = 2  # Naked singles
+GRADE_HARD = 3  # Locked candidates and naked pairs
+GRADE_EXPERT = 4  # Beyond the techniques above
+DIFFICULTY_GRADES = {EASY: GRADE_EASY, MEDIUM: GRADE_MEDIUM, HARD: GRADE_HARD}  # Grade required by each difficulty
+GRADE_ATTEMPTS = 100  # Boards generate_sudoku tries for a grade before giving up; reachable targets need < 25
+
+# Search nodes a uniqueness check may use while removing cells; past this the cell is kept
+UNIQUE_CHECK_NODES = 100
+
+# Number of ready puzzles kept per difficulty by PuzzlePool
+POOL_DEPTH = 3
+# Number of games PuzzlePool serves from each generated puzzle, as symmetric variants (1 = no variants)
+POOL_VARIANTS = 4
+
 # Determine if win
 GAME_LOSE = 0
 GAME_WIN = 1
 GAME_RESTART = 2
+GAME_SOLVED = 3  # The board was finished by the solve action or a hint, which does not count as a win
@@ -0,0 +1,376 @@
+import os
+import struct
+
+from sudoku_generator import generate_sudoku
+from constant import *
+from board import Board, UnitCounts
+from move_journal import MoveJournal
+from pencil_marks import PencilMarks
+import sudoku_solver
+import instrumentation
+
+# Saved session: magic, format version, board size, flags, journal position, journal length, then the puzzle,
+# its solution and the answer board (size * size bytes each) and the journal entries
+SAVE_MAGIC = b"SDKS"
+SAVE_VERSION = 1
+SAVE_HEADER = struct.Struct("<4sBBBxII")
+SAVE_ASSISTED = 1  # Flag: the board was finished by solve() or a hint
+
+
+class GameSession:
+    """
+    State and rules of one Sudoku game, with no dependency on pygame.
+
+    The player selects a cell, types a temporary number, and commits it to the answer board. The front end
+    (SudokuGame for pygame, or a server) translates its input into the move methods below and redraws the
+    cells listed in changed_cells.
+
+    Every committed number is compared with the solution as it is written, so is_wrong() and the win test are
+    O(1): the session counts the cells that do not hold their solution number yet.
+
+    Every change to the answer board is recorded in a MoveJournal, which gives undo/redo, reset as a rewind of
+    the journal, and compact save files (see save and load).
+
+    A board finished by solve(), or by a hint that fills its last cell, is reported as GAME_SOLVED rather than
+    GAME_WIN, so a stray key press cannot win the game.
+
+    Pencil marks (the candidates of every empty cell) are only tracked after track_candidates(True); each
+    write then refreshes the marks of the written cell's peers and adds the cells whose marks changed to
+    changed_cells.
+    """
+    __slots__ = ("sudoku_board", "answer_board", "answer_counts", "temp_board", "selected_cell",
+                 "changed_cells", "board_changed", "conflicts_changed", "solution", "unsolved_cells", "journal",
+                 "pencil_marks", "assisted")
+
+    def __init__(self, sudoku_board: Board, solution: Board = None):
+        """
+        Start a session on a puzzle. ValueError is raised if the puzzle is not 9x9 or has no solution.
+
+        :param sudoku_board: The puzzle; its non-zero cells are the given numbers and cannot be changed
+        :param solution: The solution of the puzzle, e.g. from generate_sudoku(..., with_solution=True); if
+                         omitted, the puzzle is solved here
+        """
+        if sudoku_board.size != BOARD_ROWS:
+            raise ValueError(f"the puzzle is {sudoku_board.size}x{sudoku_board.size}, not {BOARD_ROWS}x{BOARD_ROWS}")
+        if solution is None:
+            solution = sudoku_solver.solve(sudoku_board)
+            if solution is None:
+                raise ValueError("the puzzle has no solution")
+        self.sudoku_board = sudoku_board
+        self.answer_board = sudoku_board.copy()  # Given numbers plus the numbers committed by the player
+        self.answer_counts = UnitCounts(self.answer_board)  # All writes to answer_board go through this
+        self.temp_board = Board(sudoku_board.size)  # Numbers typed but not yet committed
+        self.selected_cell = []  # [row, col] of the selected cell, empty if no cell is selected
+        self.changed_cells = set()  # Cells whose display changed since the last clear_changes()
+        self.board_changed = False  # Whether every cell may have changed (e.g. after a reset)
+        self.conflicts_changed = False  # Whether an answer was written while a conflict existed before or after
+        self.solution = solution
+        self.unsolved_cells = sudoku_board.count_empty()  # Cells of answer_board not holding the solution number
+        self.journal = MoveJournal()  # Changes to answer_board, for undo/redo
+        self.pencil_marks = None  # PencilMarks of answer_board while candidates are tracked
+        self.assisted = False  # Whether solve() or a hint finished the board; kept through undo and reset
+
+    @classmethod
+    def new(cls, remove_size: int, puzzle_pool=None):
+        """
+        Start a session on a new puzzle.
+
+        :param remove_size: Difficulty of the game (number of removed cells); the named difficulties also
+                            require the matching technique grade (see DIFFICULTY_GRADES)
+        :param puzzle_pool: Optional PuzzlePool to take the puzzle from instead of generating it here
+        :return: A new GameSession
+        """
+        if puzzle_pool is not None:
+            return cls(*puzzle_pool.get(remove_size, with_solution=True))
+        return cls(*generate_sudoku(BOARD_ROWS, remove_size, unique=True, grade=DIFFICULTY_GRADES.get(remove_size),
+                                    with_solution=True))
+
+    def select(self, row: int, col: int):
+        """
+        Select a cell, first committing the temporary number of the previously selected cell.
+
+        :param row: The row index of the cell
+        :param col: The column index of the cell
+        """
+        self._commit_selected()
+        if self.selected_cell:
+            self.changed_cells.add(tuple(self.selected_cell))  # Remove the selection from the old cell
+        self.selected_cell = [row, col]
+        self.changed_cells.add((row, col))
+
+    def move(self, d_row: int, d_col: int):
+        """
+        Move the selection by an offset (as with the arrow keys), staying inside the board.
+
+        :param d_row: Rows to move down (negative to move up)
+        :param d_col: Columns to move right (negative to move left)
+        """
+        if not self.selected_cell:
+            return
+        row = self.selected_cell[0] + d_row
+        col = self.selected_cell[1] + d_col
+        if 0 <= row < self.sudoku_board.size and 0 <= col < self.sudoku_board.size:
+            self.select(row, col)
+
+    def set_temp(self, num: int):
+        """
+        Type a temporary number into the selected cell, if it is empty.
+
+        :param num: The number typed (0 clears the temporary number)
+        """
+        if self._selected_is_empty():
+            row, col = self.selected_cell
+            self.temp_board[row, col] = num
+            self.changed_cells.add((row, col))
+
+    def commit(self):
+        """
+        Commit the temporary number of the selected cell to the answer board, if the cell is empty.
+        """
+        if self._selected_is_empty():
+            row, col = self.selected_cell
+            self._set_answer(row, col, self.temp_board[row, col])
+            self.temp_board[row, col] = 0
+
+    def erase(self):
+        """
+        Remove the number committed in the selected cell. Given numbers cannot be erased.
+        """
+        if not self.selected_cell:
+            return
+        row, col = self.selected_cell
+        if self.sudoku_board[row, col] == 0 and self.answer_board[row, col] != 0:
+            self._set_answer(row, col, 0)
+            self.temp_board[row, col] = 0
+
+    def reset(self):
+        """
+        Clear every number entered by the player by rewinding the journal; the moves can still be redone.
+        """
+        self.journal.rewind()  # The journal starts from the puzzle, so the board is restored from it
+        self.answer_board.restore(self.sudoku_board.cells)
+        self.answer_counts.recount()
+        if self.pencil_marks is not None:
+            self.pencil_marks.recompute()
+        self.unsolved_cells = self.sudoku_board.count_empty()
+        self.temp_board.clear()
+        self.board_changed = True
+
+    def undo(self):
+        """
+        Take back the last change to the answer board.
+
+        :return: (row, col, number) written back to the cell, or None if there is nothing to undo
+        """
+        return self._replay(self.journal.undo())
+
+    def redo(self):
+        """
+        Make the last undone change to the answer board again.
+
+        :return: (row, col, number) written to the cell, or None if there is nothing to redo
+        """
+        return self._replay(self.journal.redo())
+
+    def hint(self):
+        """
+        Fill in one correct number: a wrong committed number is corrected first, otherwise the empty cell
+        that is easiest to deduce is filled. The hinted cell becomes the selected cell. A hint that finishes the
+        board makes the game GAME_SOLVED instead of GAME_WIN.
+
+        :return: (row, col, number) of the hinted cell, or None if the board is already solved
+        """
+        move = sudoku_solver.hint(self.answer_board, self.solution)
+        if move is not None:
+            row, col, num = move
+            self.select(row, col)
+            self._set_answer(row, col, num)
+            self.temp_board[row, col] = 0
+            if self.unsolved_cells == 0:
+                self.assisted = True
+        return move
+
+    def solve(self):
+        """
+        Fill the whole answer board with the solution. The game is then GAME_SOLVED, not GAME_WIN.
+        """
+        self.assisted = True
+        size = self.answer_board.size
+        for cell, (num, answer) in enumerate(zip(self.answer_board.cells, self.solution.cells)):
+            if num != answer:
+                self._set_answer(cell // size, cell % size, answer)
+        self.temp_board.clear()
+        self.board_changed = True
+
+    def track_candidates(self, enabled: bool):
+        """
+        Start or stop keeping the pencil marks of the answer board up to date.
+
+        :param enabled: Whether to track candidates; when False, writes cost nothing extra
+        """
+        if enabled and self.pencil_marks is None:
+            self.pencil_marks = PencilMarks(self.answer_counts)
+        elif not enabled:
+            self.pencil_marks = None
+        self.board_changed = True
+
+    def is_full(self):
+        """
+        :return: True if every cell of the answer board is filled
+        """
+        return self.answer_counts.is_full()
+
+    def is_won(self):
+        """
+        :return: True if the answer board is full and has no repeated number in any row, column or box
+        """
+        return self.unsolved_cells == 0 or self.answer_counts.is_solved()  # A puzzle may have other solutions
+
+    def is_wrong(self, row: int, col: int):
+        """
+        :param row: The row index of the cell
+        :param col: The column index of the cell
+        :return: True if the player committed a number to the cell that differs from the solution
+        """
+        num = self.answer_board[row, col]
+        return num != 0 and num != self.solution[row, col]
+
+    def status(self):
+        """
+        :return: GAME_WIN if the game is won, GAME_SOLVED if the board was finished with solve() or a hint,
+                 GAME_LOSE if the board is full but wrong, None while playing
+        """
+        if self.unsolved_cells == 0:
+            return GAME_SOLVED if self.assisted else GAME_WIN
+        if not self.answer_counts.is_full():
+            return None
+        if not self.answer_counts.is_solved():
+            return GAME_LOSE
+        return GAME_SOLVED if self.assisted else GAME_WIN
+
+    def save(self, path: str):
+        """
+        Save the session: the puzzle, its solution, the answer board and the journal, so undo/redo keep working
+        after load(). The file is replaced atomically. Temporary numbers and the selection are not saved.
+
+        :param path: File to write
+        """
+        journal = self.journal
+        flags = SAVE_ASSISTED if self.assisted else 0
+        header = SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, self.sudoku_board.size, flags, journal.position,
+                                  len(journal))
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(b"".join((header, self.sudoku_board.cells, self.solution.cells, self.answer_board.cells,
+                                 journal.to_bytes())))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Resume a session written by save(). Nothing is replayed or solved, so this takes well under a millisecond
+        plus the time to read the file.
+
+        :param path: File to read
+        :return: A new GameSession
+        """
+        with open(path, "rb") as file:
+            data = file.read()
+        if len(data) < SAVE_HEADER.size:
+            raise ValueError(f"{path} is not a version {SAVE_VERSION} saved game")
+        magic, version, size, flags, position, length = SAVE_HEADER.unpack_from(data)
+        board_size = size * size
+        expected_size = SAVE_HEADER.size + 3 * board_size + 4 * length
+        if magic != SAVE_MAGIC or version != SAVE_VERSION or len(data) != expected_size or position > length:
+            raise ValueError(f"{path} is not a version {SAVE_VERSION} saved game")
+        start = SAVE_HEADER.size
+        puzzle, solution, answers = (Board(size, data[start + k * board_size:start + (k + 1) * board_size])
+                                     for k in range(3))
+        session = cls(puzzle, solution)
+        session.answer_board.restore(answers.cells)
+        session.answer_counts.recount()
+        session.unsolved_cells = sum(num != answer for num, answer in zip(answers.cells, solution.cells))
+        session.journal = MoveJournal.from_bytes(data[start + 3 * board_size:], position)
+        session.assisted = bool(flags & SAVE_ASSISTED)
+        return session
+
+    def clear_changes(self):
+        """
+        Forget the recorded changes, once the front end has redrawn them.
+        """
+        self.changed_cells.clear()
+        self.board_changed = False
+        self.conflicts_changed = False
+
+    def _selected_is_empty(self):
+        """
+        :return: True if a cell is selected and it holds neither a given nor a committed number
+        """
+        if not self.selected_cell:
+            return False
+        row, col = self.selected_cell
+        return self.sudoku_board[row, col] == 0 and self.answer_board[row, col] == 0
+
+    def _commit_selected(self):
+        """
+        Commit the temporary number of the selected cell when the selection moves away from it.
+        """
+        if self.selected_cell:
+            row, col = self.selected_cell
+            if self.answer_board[row, col] == 0:
+                self._set_answer(row, col, self.temp_board[row, col])
+                self.temp_board[row, col] = 0
+
+    def _replay(self, move: tuple):
+        """
+        Apply a move returned by the journal's undo or redo, without recording it, and select its cell. The
+        temporary number of the previously selected cell is dropped rather than committed.
+
+        :param move: (cell, number) or None
+        :return: (row, col, number), or None if move is None
+        """
+        if move is None:
+            return None
+        cell, num = move
+        row, col = divmod(cell, self.answer_board.size)
+        if self.selected_cell:
+            self.temp_board[self.selected_cell[0], self.selected_cell[1]] = 0
+            self.changed_cells.add(tuple(self.selected_cell))
+        self.selected_cell = [row, col]
+        self._write_answer(row, col, num)
+        self.temp_board[row, col] = 0
+        return row, col, num
+
+    def _set_answer(self, row: int, col: int, num: int):
+        """
+        Write a number (0 to erase) into answer_board and record the change in the journal.
+
+        :param row: The row index of the cell
+        :param col: The column index of the cell
+        :param num: The number to write
+        """
+        old = self.answer_board[row, col]
+        if old != num:
+            self.journal.record(row * self.answer_board.size + col, old, num)
+        self._write_answer(row, col, num)
+
+    def _write_answer(self, row: int, col: int, num: int):
+        """
+        Write a number (0 to erase) into answer_board, keeping the win/conflict counts up to date.
+
+        :param row: The row index of the cell
+        :param col: The column index of the cell
+        :param num: The number to write
+        """
+        had_conflicts = self.answer_counts.conflicts
+        answer = self.solution[row, col]
+        self.unsolved_cells += (self.answer_board[row, col] == answer) - (num == answer)
+        self.answer_counts.set(row, col, num)
+        self.changed_cells.add((row, col))
+        if self.pencil_marks is not None:
+            self.changed_cells.update(self.pencil_marks.update(row, col))
+        if had_conflicts or self.answer_counts.conflicts:
+            self.conflicts_changed = True  # Highlighting of other cells may have changed
+
+
+instrumentation.instrument(GameSession, "status", "hint", "solve")
@@ -0,0 +1,163 @@
+"""
+Opt-in counters and timing histograms for the generator and the game loop.
+
+Instrumentation is off by default and then costs nothing: modules register the functions worth measuring
+with instrument(), which only installs a wrapper once instrumentation is enabled. Code that counts inside a
+hot loop keeps a local counter and reports it once through count(), behind an `if instrumentation.enabled`
+check.
+
+Enable it with the environment variable SUDOKU_PROFILE, or call enable() (e.g. from a --profile flag):
+
+    SUDOKU_PROFILE=1            print the collected metrics as JSON to stderr at exit
+    SUDOKU_PROFILE=stats.json   write them to that file at exit
+    SUDOKU_PROFILE_INTERVAL=5   also log them to stderr every 5 seconds
+
+Metrics are collected per process, so puzzles generated in worker processes are not counted.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+ENV_VAR = "SUDOKU_PROFILE"
+INTERVAL_ENV_VAR = "SUDOKU_PROFILE_INTERVAL"
+
+enabled = False  # Checked by hot code before reporting local counters
+_lock = threading.Lock()
+_counters = {}
+_timers = {}  # name -> [count, total seconds, max seconds, histogram list indexed by bucket]
+_registered = []  # (owner, attribute, metric name) of every instrumented function
+_start = time.perf_counter()
+
+
+def count(name: str, amount: int = 1):
+    """
+    Add to a counter. Only call this when instrumentation is enabled.
+
+    :param name: Counter name, such as "fill_remaining.backtracks"
+    :param amount: Amount to add
+    """
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def record(name: str, seconds: float):
+    """
+    Add one duration to a timing histogram. Only call this when instrumentation is enabled.
+
+    Buckets are powers of two in microseconds: bucket k holds durations below 2^k us.
+
+    :param name: Timer name, such as "SudokuGame._update_screen"
+    :param seconds: Duration in seconds
+    """
+    bucket = int(seconds * 1e6).bit_length()
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = _timers[name] = [0, 0.0, 0.0, []]
+        timer[0] += 1
+        timer[1] += seconds
+        timer[2] = max(timer[2], seconds)
+        histogram = timer[3]
+        if bucket >= len(histogram):
+            histogram.extend([0] * (bucket + 1 - len(histogram)))
+        histogram[bucket] += 1
+
+
+def _wrap(function, name: str):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            record(name, time.perf_counter() - start)
+    wrapper.__wrapped_by_instrumentation__ = True
+    return wrapper
+
+
+def _install(owner, attribute: str, name: str):
+    function = getattr(owner, attribute)
+    if not getattr(function, "__wrapped_by_instrumentation__", False):
+        setattr(owner, attribute, _wrap(function, name))
+
+
+def instrument(owner, *attributes: str):
+    """
+    Register functions to time (and count) when instrumentation is enabled. Nothing is changed while it is
+    disabled, so registering has no cost.
+
+    :param owner: Class or module holding the functions
+    :param attributes: Names of the functions; each is reported as "Owner.attribute"
+    """
+    for attribute in attributes:
+        name = f"{owner.__name__}.{attribute}"
+        _registered.append((owner, attribute, name))
+        if enabled:
+            _install(owner, attribute, name)
+
+
+def snapshot():
+    """
+    :return: The metrics collected so far, as a JSON-serializable dict
+    """
+    with _lock:
+        timers = {}
+        for name, (calls, total, longest, histogram) in sorted(_timers.items()):
+            timers[name] = {
+                "count": calls,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total / calls * 1000, 4),
+                "max_ms": round(longest * 1000, 3),
+                "histogram_us": {f"<{1 << bucket}": n for bucket, n in enumerate(histogram) if n},
+            }
+        return {
+            "uptime_s": round(time.perf_counter() - _start, 3),
+            "counters": dict(sorted(_counters.items())),
+            "timers": timers,
+        }
+
+
+def dump(path: str = None):
+    """
+    Write the metrics as JSON.
+
+    :param path: File to write, or None for stderr
+    """
+    text = json.dumps(snapshot(), indent=2)
+    if path is None:
+        print(text, file=sys.stderr)
+    else:
+        with open(path, "w") as file:
+            file.write(text + "\n")
+
+
+def _log_loop(interval: float):
+    while True:
+        time.sleep(interval)
+        print(json.dumps(snapshot()), file=sys.stderr, flush=True)
+
+
+def enable(path: str = None, interval: float = None):
+    """
+    Turn instrumentation on: wrap every registered function and dump the metrics at exit.
+
+    :param path: File to write the metrics to at exit, or None for stderr
+    :param interval: Optional period in seconds of a one-line JSON log to stderr
+    """
+    global enabled
+    if not enabled:
+        enabled = True
+        for owner, attribute, name in _registered:
+            _install(owner, attribute, name)
+        atexit.register(dump, path)
+    if interval:
+        threading.Thread(target=_log_loop, args=(interval,), name="instrumentation", daemon=True).start()
+
+
+_setting = os.environ.get(ENV_VAR, "")
+if _setting and _setting != "0":
+    enable(None if _setting in ("1", "stderr") else _setting, float(os.environ.get(INTERVAL_ENV_VAR, 0)) or None)
@@ -0,0 +1,140 @@
+"""
+Load generator for sudoku_server.py.
+
+Opens many concurrent client connections; each starts a game and plays random moves. Reports the p50/p99
+latency of move commands (NEW is timed separately, since it includes puzzle generation). With --ramp the
+number of clients doubles until the p99 move latency exceeds --p99-limit, and the largest number of
+concurrent sessions that stayed under the limit is reported.
+
+Usage:  python load_test.py [--clients 100] [--moves 200] [--ramp] [--host H --port P]
+Without --host, a server is started in this process on a free port.
+"""
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sudoku_server import SudokuServer
+
+
+def percentile(values: list, fraction: float):
+    """
+    :param values: Sorted list of numbers
+    :param fraction: Percentile as a fraction (0.99 for p99)
+    :return: The value at that percentile
+    """
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run_client(host: str, port: int, moves: int, seed: int, new_latencies: list, move_latencies: list):
+    """
+    Play one game of random moves and record the latency of every request.
+    """
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def request(line: str):
+        writer.write(line.encode("ascii") + b"\n")
+        await writer.drain()
+        reply = await reader.readline()
+        if not reply.startswith(b"OK"):
+            raise RuntimeError(f"{line!r} failed: {reply!r}")
+
+    start = time.perf_counter()
+    await request("NEW " + rng.choice(("easy", "medium", "hard")))
+    new_latencies.append(time.perf_counter() - start)
+    for _ in range(moves):
+        kind = rng.random()
+        if kind < 0.4:
+            line = f"SELECT {rng.randrange(9)} {rng.randrange(9)}"
+        elif kind < 0.7:
+            line = f"SET {rng.randrange(1, 10)}"
+        elif kind < 0.9:
+            line = "COMMIT"
+        elif kind < 0.98:
+            line = "STATUS"
+        else:
+            line = "ERASE"
+        start = time.perf_counter()
+        await request(line)
+        move_latencies.append(time.perf_counter() - start)
+    writer.write(b"QUIT\n")
+    await writer.drain()
+    writer.close()
+
+
+async def run_round(host: str, port: int, clients: int, moves: int, seed: int):
+    """
+    Run one round of concurrent clients.
+
+    :return: (sorted NEW latencies, sorted move latencies, number of failed clients, wall time)
+    """
+    new_latencies = []
+    move_latencies = []
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(run_client(host, port, moves, seed + i, new_latencies, move_latencies) for i in range(clients)),
+        return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    failures = sum(isinstance(result, BaseException) for result in results)
+    return sorted(new_latencies), sorted(move_latencies), failures, elapsed
+
+
+def report(clients: int, new_latencies: list, move_latencies: list, failures: int, elapsed: float):
+    """
+    Print the results of one round.
+    """
+    if not move_latencies:
+        print(f"{clients:5d} clients: all failed")
+        return
+    print(f"{clients:5d} clients: move p50 {percentile(move_latencies, 0.5) * 1000:7.3f} ms  "
+          f"p99 {percentile(move_latencies, 0.99) * 1000:7.3f} ms  "
+          f"NEW p50 {percentile(new_latencies, 0.5) * 1000:7.1f} ms  "
+          f"{len(move_latencies) / elapsed:8.0f} moves/s  {failures} failed")
+
+
+async def main(args):
+    server = None
+    executor = None
+    host, port = args.host, args.port
+    if host is None:
+        executor = ProcessPoolExecutor(args.workers)
+        server = await SudokuServer(executor).start("127.0.0.1", 0)
+        host, port = "127.0.0.1", server.sockets[0].getsockname()[1]
+
+    try:
+        if not args.ramp:
+            report(args.clients, *await run_round(host, port, args.clients, args.moves, args.seed))
+            return
+
+        sustained = 0
+        clients = args.clients
+        while clients <= args.max_clients:
+            new_latencies, move_latencies, failures, elapsed = await run_round(
+                host, port, clients, args.moves, args.seed)
+            report(clients, new_latencies, move_latencies, failures, elapsed)
+            if failures or not move_latencies or percentile(move_latencies, 0.99) * 1000 > args.p99_limit:
+                break
+            sustained = clients
+            clients *= 2
+        print(f"sustained {sustained} concurrent sessions with move p99 under {args.p99_limit} ms")
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+            executor.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test for the Sudoku server")
+    parser.add_argument("--host", default=None, help="server to test (default: start one in this process)")
+    parser.add_argument("--port", type=int, default=8765, help="port of the server to test")
+    parser.add_argument("--clients", type=int, default=100, help="concurrent clients (first round with --ramp)")
+    parser.add_argument("--moves", type=int, default=200, help="moves played by each client")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the clients' random moves")
+    parser.add_argument("--workers", type=int, default=None, help="generation processes of the in-process server")
+    parser.add_argument("--ramp", action="store_true", help="double the clients until p99 exceeds --p99-limit")
+    parser.add_argument("--p99-limit", type=float, default=50.0, help="p99 move latency limit in ms for --ramp")
+    parser.add_argument("--max-clients", type=int, default=4096, help="stop ramping after this many clients")
+    asyncio.run(main(parser.parse_args()))
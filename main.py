@@ -1,12 +1,68 @@
-from sudokuGame import *
+import argparse
+import os
+import sys
+
+from constant import *
+from game_session import GameSession
+from puzzle_pool import PuzzlePool
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sudoku")
+    parser.add_argument("--archive", help="play puzzles from a puzzle archive (see puzzle_archive.py)")
+    parser.add_argument("--index", type=int, default=0, help="archive position to start searching from")
+    parser.add_argument("--show-errors", action="store_true", default=SHOW_ERRORS,
+                        help="highlight committed numbers that differ from the solution")
+    parser.add_argument("--candidates", action="store_true", default=SHOW_CANDIDATES,
+                        help="show the candidates (pencil marks) of empty cells; C toggles them in the game")
+    parser.add_argument("--save", metavar="PATH",
+                        help="save an unfinished game to PATH when the window is closed, and resume it on start")
+    parser.add_argument("--profile", nargs="?", const="-", metavar="PATH",
+                        help="collect counters and timings and write them as JSON to PATH (default stderr) at exit")
+    parser.add_argument("--profile-interval", type=float, metavar="SECONDS",
+                        help="with --profile, also log the metrics to stderr every SECONDS")
+    args = parser.parse_args()
+    if args.profile:
+        import instrumentation
+        instrumentation.enable(None if args.profile == "-" else args.profile, args.profile_interval)
+    archive = None
+    if args.archive:
+        from puzzle_archive import PuzzleArchive
+        archive = PuzzleArchive(args.archive)
+    next_index = args.index  # Archive position after the last puzzle played
+
+    session = None
+    if args.save and os.path.exists(args.save):
+        try:
+            session = GameSession.load(args.save)  # Resume the game saved when the window was last closed; the
+                                                   # file is kept until the game ends, in case this run is killed
+        except (OSError, ValueError) as error:
+            print(f"warning: cannot resume the saved game, starting a new one ({error})", file=sys.stderr)
+
+    puzzle_pool = PuzzlePool().start()  # Generate puzzles in the background while pygame loads and the start
+                                        # screen is shown
+    from sudokuGame import AppContext, DisplayStartOver, SudokuGame  # Only the GUI imports pygame
+    app = AppContext()  # One window for every screen
+    menu = DisplayStartOver(app)
     while True:
-        game_start_screen = DisplayStartOver()
-        difficulty = game_start_screen.draw_game_start()  # Display game start screen and return the difficulty
-        sudoku = SudokuGame(difficulty)  # Start the game with specific difficulty
-        game_status = sudoku.run_game()  # sudoku.run_game() return True if game win, False otherwise
+        difficulty = None
+        if session is None:
+            difficulty = menu.draw_game_start()  # Display game start screen and return the difficulty
+            while archive is not None and session is None:
+                index = archive.find(difficulty, next_index)  # Next archived puzzle of this difficulty, if any
+                if index < 0:
+                    break
+                next_index = index + 1
+                try:
+                    session = GameSession(archive.puzzle(index))
+                except ValueError as error:
+                    print(f"warning: skipping archive entry {index} ({error})", file=sys.stderr)
+        # Start the game with specific difficulty, or play the resumed session or archived puzzle
+        sudoku = SudokuGame(difficulty, puzzle_pool, show_errors=args.show_errors, session=session,
+                            save_path=args.save, app=app, show_candidates=args.candidates)
+        session = None
+        game_status = sudoku.run_game()  # GAME_WIN, GAME_SOLVED (finished with S or H), GAME_LOSE or GAME_RESTART
+        if args.save and os.path.exists(args.save):
+            os.remove(args.save)  # The resumed game is over or was left with RESTART; closing the window saves again
         if game_status == GAME_RESTART:  # Game restart
             continue
-        game_end_screen = DisplayStartOver()
-        game_end_screen.draw_game_over(game_status)  # Display game end screen
+        menu.draw_game_over(game_status)  # Display game end screen
@@ -0,0 +1,99 @@
+import sys
+from array import array
+
+
+class MoveJournal:
+    """
+    History of the numbers written to a board, for undo and redo.
+
+    Each change is one (cell, old, new) delta packed into a 32-bit integer of an array, so a journal of
+    thousands of moves takes a few kilobytes and is saved as raw bytes. position splits the journal into the
+    moves that are applied (before it) and the moves that were undone and can be redone (after it). Undo and
+    redo only move position; recording a new move drops the moves that were undone.
+    """
+    __slots__ = ("_entries", "position")
+
+    def __init__(self, entries: array = None, position: int = None):
+        """
+        :param entries: Optional packed deltas to start from, e.g. from from_bytes()
+        :param position: Number of entries that are applied (default: all of them)
+        """
+        self._entries = entries if entries is not None else array("I")
+        self.position = len(self._entries) if position is None else position
+        if not 0 <= self.position <= len(self._entries):
+            raise ValueError("journal position out of range")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def record(self, cell: int, old: int, new: int):
+        """
+        Add a change, discarding the moves that can be redone.
+
+        :param cell: Index of the cell (row * size + col)
+        :param old: Number the cell held before (0 for empty)
+        :param new: Number written to the cell (0 for empty)
+        """
+        if self.position < len(self._entries):
+            del self._entries[self.position:]
+        self._entries.append(cell << 16 | old << 8 | new)
+        self.position += 1
+
+    def can_undo(self):
+        return self.position > 0
+
+    def can_redo(self):
+        return self.position < len(self._entries)
+
+    def undo(self):
+        """
+        Step back one move.
+
+        :return: (cell, number to write back) of the move, or None if there is nothing to undo
+        """
+        if self.position == 0:
+            return None
+        self.position -= 1
+        entry = self._entries[self.position]
+        return entry >> 16, entry >> 8 & 0xFF
+
+    def redo(self):
+        """
+        Step forward one undone move.
+
+        :return: (cell, number to write again) of the move, or None if there is nothing to redo
+        """
+        if self.position == len(self._entries):
+            return None
+        entry = self._entries[self.position]
+        self.position += 1
+        return entry >> 16, entry & 0xFF
+
+    def rewind(self):
+        """
+        Undo every move at once; the caller restores the board to its state before the first move.
+        """
+        self.position = 0
+
+    def to_bytes(self):
+        """
+        :return: The entries as little-endian 32-bit integers
+        """
+        if sys.byteorder == "little":
+            return self._entries.tobytes()
+        entries = array("I", self._entries)
+        entries.byteswap()
+        return entries.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, position: int = None):
+        """
+        :param data: Bytes written by to_bytes()
+        :param position: Number of entries that are applied (default: all of them)
+        :return: A new MoveJournal
+        """
+        entries = array("I")
+        entries.frombytes(data)
+        if sys.byteorder != "little":
+            entries.byteswap()
+        return cls(entries, position)
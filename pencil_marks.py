@@ -0,0 +1,85 @@
+from board import UnitCounts, peer_lists, unit_tables
+
+
+class PencilMarks:
+    """
+    Candidate digits (pencil marks) of every empty cell, kept up to date as cells change.
+
+    The candidates of a cell are the digits not used in its row, column or box, stored as a bitmask (bit n set
+    = digit n is possible). The used digits of each unit are kept as bitmasks too, read from the counts of a
+    UnitCounts, so after one cell changes only its three units and the masks of the cell and its peers (20 on a
+    9x9 board) are refreshed, instead of the whole board.
+    """
+    __slots__ = ("counts", "masks", "row_used", "col_used", "box_used", "_rows", "_cols", "_boxes", "_peers",
+                 "_all_digits")
+
+    def __init__(self, counts: UnitCounts):
+        """
+        :param counts: UnitCounts of the board to follow; call update() after each of its set() calls
+        """
+        self.counts = counts
+        size = counts.board.size
+        self._rows, self._cols, self._boxes, _ = unit_tables(size)  # Shared tables; only read here
+        self._peers = peer_lists(size)
+        self._all_digits = (1 << (size + 1)) - 2  # Bits 1..size
+        self.recompute()
+
+    def recompute(self):
+        """
+        Rebuild every mask, e.g. after the counts were rebuilt with UnitCounts.recount().
+        """
+        size = self.counts.board.size
+        self.row_used = [self._used(self.counts.row_counts, unit) for unit in range(size)]
+        self.col_used = [self._used(self.counts.col_counts, unit) for unit in range(size)]
+        self.box_used = [self._used(self.counts.box_counts, unit) for unit in range(size)]
+        self.masks = [self._mask(cell) for cell in range(size * size)]  # Candidates of each cell, 0 if filled
+
+    def update(self, row: int, col: int):
+        """
+        Refresh the candidates around a cell that was just written through UnitCounts.set().
+
+        :param row: The row index of the cell
+        :param col: The column index of the cell
+        :return: List of (row, col) of the cells whose candidates changed
+        """
+        cell = row * self.counts.board.size + col
+        box = self._boxes[cell]
+        self.row_used[row] = self._used(self.counts.row_counts, row)
+        self.col_used[col] = self._used(self.counts.col_counts, col)
+        self.box_used[box] = self._used(self.counts.box_counts, box)
+        changed = []
+        masks = self.masks
+        for other in [cell] + self._peers[cell]:
+            mask = self._mask(other)
+            if mask != masks[other]:
+                masks[other] = mask
+                changed.append((self._rows[other], self._cols[other]))
+        return changed
+
+    def candidates(self, row: int, col: int):
+        """
+        :return: Bitmask of the candidates of the cell (bit n set = digit n), 0 if the cell is filled
+        """
+        return self.masks[row * self.counts.board.size + col]
+
+    def _used(self, counts: bytearray, unit: int):
+        """
+        :param counts: One of the count arrays of UnitCounts
+        :param unit: Index of the row, column or box
+        :return: Bitmask of the digits used in the unit
+        """
+        stride = self.counts.board.size + 1
+        used = 0
+        for num, count in enumerate(counts[unit * stride:(unit + 1) * stride]):
+            if count:
+                used |= 1 << num
+        return used
+
+    def _mask(self, cell: int):
+        """
+        :return: Candidates of a cell from the current unit masks
+        """
+        if self.counts.board.cells[cell]:
+            return 0
+        used = self.row_used[self._rows[cell]] | self.col_used[self._cols[cell]] | self.box_used[self._boxes[cell]]
+        return self._all_digits & ~used
@@ -0,0 +1,242 @@
+"""
+Compact binary archive of puzzles with random access through mmap.
+
+Layout (little endian):
+
+    header   8 bytes   magic b"SDKA", format version, board size, 2 reserved bytes
+    records  51 bytes each, puzzle k at offset 8 + 51 * k
+             41 bytes  the 81 cells, two per byte (high nibble first), 0 for an empty cell
+              8 bytes  seed the puzzle was generated from (see generate_sudoku), if FLAG_SEEDED is set
+              1 byte   difficulty: number of cells the generator was asked to remove
+              1 byte   flags: technique grade in the low 4 bits (0 if ungraded), FLAG_UNIQUE, FLAG_SEEDED
+
+Records have a fixed size, so the index of puzzle k is its offset and no separate index table is needed;
+reading one puzzle touches one page of the file. The number of puzzles follows from the file size, so an
+archive can be appended to; a reader sees the puzzles that were complete when it was opened.
+
+Usage:  python puzzle_archive.py ARCHIVE [INDEX]    (print the archive size, or one puzzle)
+"""
+import mmap
+import struct
+import sys
+
+from board import Board
+from sudoku_generator import generate_sudoku
+
+MAGIC = b"SDKA"
+VERSION = 1
+HEADER = struct.Struct("<4sBB2x")
+RECORD_TAIL = struct.Struct("<QBB")  # seed, difficulty, flags
+FLAG_UNIQUE = 0x10  # The puzzle has a unique solution
+FLAG_SEEDED = 0x20  # The seed field holds the seed the puzzle was generated from
+GRADE_MASK = 0x0F
+
+# Two nibbles of a packed byte, as unpacked cell values
+_UNPACK = [bytes((byte >> 4, byte & 0x0F)) for byte in range(256)]
+
+
+def packed_size(size: int):
+    """
+    :param size: Number of rows/columns of the board
+    :return: Number of bytes holding the cells of one puzzle
+    """
+    return (size * size + 1) // 2
+
+
+def pack_cells(board: Board):
+    """
+    Pack the cells of a board two per byte.
+
+    :param board: Board with values up to 15
+    :return: bytes of length packed_size(board.size)
+    """
+    cells = board.cells if len(board.cells) % 2 == 0 else board.cells + b"\0"
+    return bytes([high << 4 | low for high, low in zip(cells[0::2], cells[1::2])])
+
+
+def unpack_cells(data, size: int):
+    """
+    Unpack the cells written by pack_cells.
+
+    :param data: Packed bytes (any bytes-like object, such as a slice of an mmap)
+    :param size: Number of rows/columns of the board
+    :return: A new Board
+    """
+    return Board(size, b"".join([_UNPACK[byte] for byte in data])[:size * size])
+
+
+class ArchiveEntry:
+    """
+    One puzzle of an archive, with what is needed to regenerate it.
+    """
+    __slots__ = ("puzzle", "seed", "difficulty", "grade", "unique")
+
+    def __init__(self, puzzle: Board, seed: int = None, difficulty: int = 0, grade: int = None,
+                 unique: bool = True):
+        """
+        :param puzzle: The puzzle (0 for an empty cell)
+        :param seed: Seed the puzzle was generated from, or None if unknown
+        :param difficulty: Number of cells the generator was asked to remove
+        :param grade: Technique grade the generator was asked for (see sudoku_grader.py), or None
+        :param unique: Whether the puzzle has a unique solution
+        """
+        self.puzzle = puzzle
+        self.seed = seed
+        self.difficulty = difficulty
+        self.grade = grade
+        self.unique = unique
+
+    def regenerate(self):
+        """
+        Generate the puzzle again from its seed, e.g. to check an archive.
+
+        :return: A new Board, equal to puzzle for an entry written by the batch generator
+        """
+        if self.seed is None:
+            raise ValueError("entry has no seed")
+        return generate_sudoku(self.puzzle.size, self.difficulty, self.unique, self.grade, self.seed)
+
+
+class ArchiveWriter:
+    """
+    Streams puzzles to an archive file. Use as a context manager, or call close().
+    """
+    def __init__(self, path: str, size: int = 9, append: bool = False):
+        """
+        Open an archive for writing.
+
+        :param path: File to write
+        :param size: Number of rows/columns of the boards (at most 9, since cells are stored as nibbles)
+        :param append: Whether to add to an existing archive instead of replacing it
+        """
+        if size > 9:
+            raise ValueError("archives store cells as nibbles and only hold boards up to 9x9")
+        self.size = size
+        self.record_size = packed_size(size) + RECORD_TAIL.size
+        self.count = 0  # Number of puzzles written by this writer
+        if append:
+            self.file = open(path, "r+b")
+            magic, version, archive_size = HEADER.unpack(self.file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION or archive_size != size:
+                self.file.close()
+                raise ValueError(f"{path} is not a version {VERSION} archive of {size}x{size} boards")
+            self.file.seek(0, 2)
+        else:
+            self.file = open(path, "wb")
+            self.file.write(HEADER.pack(MAGIC, VERSION, size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, puzzle: Board, seed: int = None, difficulty: int = 0, grade: int = None,
+              unique: bool = True):
+        """
+        Append one puzzle.
+
+        :param puzzle: The puzzle (0 for an empty cell)
+        :param seed: Seed the puzzle was generated from, or None if unknown
+        :param difficulty: Number of cells the generator was asked to remove
+        :param grade: Technique grade the generator was asked for, or None
+        :param unique: Whether the puzzle has a unique solution
+        """
+        if puzzle.size != self.size:
+            raise ValueError(f"expected a {self.size}x{self.size} board, got {puzzle.size}x{puzzle.size}")
+        flags = (grade or 0) | (FLAG_UNIQUE if unique else 0) | (FLAG_SEEDED if seed is not None else 0)
+        self.file.write(pack_cells(puzzle) + RECORD_TAIL.pack(seed or 0, difficulty, flags))
+        self.count += 1
+
+    def write_entry(self, entry: ArchiveEntry):
+        """
+        Append one ArchiveEntry, e.g. one read from another archive.
+        """
+        self.write(entry.puzzle, entry.seed, entry.difficulty, entry.grade, entry.unique)
+
+    def close(self):
+        self.file.close()
+
+
+class PuzzleArchive:
+    """
+    Read-only view of an archive. The file is memory-mapped, so opening it is O(1) whatever its size and
+    archive[k] only reads the page holding puzzle k.
+    """
+    def __init__(self, path: str):
+        """
+        :param path: Archive file to open
+        """
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} puzzle archive")
+        self._cells_size = packed_size(self.size)
+        self.record_size = self._cells_size + RECORD_TAIL.size
+        self._count = (len(self._map) - HEADER.size) // self.record_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index: int):
+        """
+        :param index: Position of the puzzle in the archive (negative counts from the end)
+        :return: ArchiveEntry
+        """
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("archive index out of range")
+        offset = HEADER.size + index * self.record_size
+        puzzle = unpack_cells(self._map[offset:offset + self._cells_size], self.size)
+        seed, difficulty, flags = RECORD_TAIL.unpack_from(self._map, offset + self._cells_size)
+        return ArchiveEntry(puzzle, seed if flags & FLAG_SEEDED else None, difficulty,
+                            (flags & GRADE_MASK) or None, bool(flags & FLAG_UNIQUE))
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def find(self, difficulty: int, start: int = 0):
+        """
+        Find the next puzzle of a difficulty, reading only the difficulty byte of each record.
+
+        :param difficulty: Number of removed cells to look for
+        :param start: Position to start searching from
+        :return: Position of the first matching puzzle at or after start, or -1 if there is none
+        """
+        offset = HEADER.size + self._cells_size + 8  # Difficulty byte of record 0
+        for index in range(max(start, 0), self._count):
+            if self._map[offset + index * self.record_size] == difficulty:
+                return index
+        return -1
+
+    def puzzle(self, index: int):
+        """
+        :param index: Position of the puzzle in the archive
+        :return: The puzzle as a Board
+        """
+        return self[index].puzzle
+
+    def close(self):
+        self._map.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3):
+        sys.exit(__doc__)
+    with PuzzleArchive(sys.argv[1]) as archive:
+        if len(sys.argv) == 2:
+            print(f"{len(archive)} puzzles of {archive.size}x{archive.size}, {archive.record_size} bytes each")
+        else:
+            entry = archive[int(sys.argv[2])]
+            seed = "none" if entry.seed is None else f"{entry.seed:016x}"
+            print(f"{entry.puzzle.to_string()} seed {seed} difficulty {entry.difficulty} grade {entry.grade}")
@@ -0,0 +1,136 @@
+import random
+import threading
+from collections import deque
+
+from sudoku_generator import generate_sudoku
+from constant import *
+
+
+class PuzzlePool:
+    """
+    Keeps a queue of ready-made puzzles for each difficulty so a new game can start without waiting
+    for the generator. A background thread tops every queue up to the configured depth.
+
+    Each generated puzzle is also served as up to variants - 1 symmetric variants (see sudoku_symmetry.py),
+    which cost microseconds instead of a full generation, and a miss is answered with a variant of the last
+    generated puzzle of its difficulty when there is one. Puzzles are kept with their solutions.
+    """
+    def __init__(self, difficulties: tuple = (EASY, MEDIUM, HARD), depth: int = POOL_DEPTH, size: int = 9,
+                 seed: int = None, variants: int = POOL_VARIANTS):
+        """
+        Initialize an empty pool. Call start() to begin filling it.
+
+        :param difficulties: Difficulties (numbers of removed cells) to keep puzzles for
+        :param depth: Number of puzzles to keep ready for each difficulty
+        :param size: Number of rows/columns of the generated boards
+        :param seed: Optional seed of the refill thread's private RNG, for a reproducible sequence of puzzles
+        :param variants: Number of puzzles served from each generated puzzle (1 disables variants)
+        """
+        self.depth = depth
+        self.size = size
+        self.variants = variants
+        self.hits = 0  # Number of get() calls served from the pool
+        self.misses = 0  # Number of get() calls that found the queue empty
+        self._queues = {difficulty: deque() for difficulty in difficulties}  # (puzzle, solution) pairs
+        self._bases = {}  # Last generated (puzzle, solution) of each difficulty
+        self._base_uses = {}  # Number of queued puzzles derived from each base, the base included
+        self._lock = threading.Lock()
+        self._wake = threading.Event()  # Set whenever a queue may have dropped below depth
+        self._stopped = False
+        self._thread = None
+        self._rng = random.Random(seed)  # Used only by the refill thread, so it never contends with callers
+
+    def start(self):
+        """
+        Start the background refill thread.
+
+        :return: The pool itself, so it can be created and started in one expression
+        """
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self._refill_loop, name="PuzzlePool", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the background refill thread and wait for it to finish the puzzle it is generating.
+        """
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get(self, difficulty: int, with_solution: bool = False):
+        """
+        Take a puzzle from the pool. If the pool is empty, a variant of the last generated puzzle of the difficulty
+        is returned, or a puzzle is generated synchronously if there is none yet.
+
+        :param difficulty: Number of cells removed from the puzzle
+        :param with_solution: Whether to return the solution of the puzzle too
+        :return: A Board holding the puzzle, or (puzzle, solution) Boards if with_solution is True
+        """
+        entry = None
+        with self._lock:
+            queue = self._queues.get(difficulty)
+            if queue:
+                entry = queue.popleft()
+                self.hits += 1
+            else:
+                self.misses += 1
+            base = self._bases.get(difficulty) if self.variants > 1 else None
+        self._wake.set()  # Let the refill thread replace what was taken
+        if entry is None:
+            entry = generate_sudoku(self.size, difficulty, unique=True, grade=DIFFICULTY_GRADES.get(difficulty),
+                                    base=base, with_solution=True)
+        return entry if with_solution else entry[0]
+
+    def stats(self):
+        """
+        Report pool usage, for sizing the pool depth.
+
+        :return: A dict with the hit and miss counts and the current number of puzzles per difficulty
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "ready": {difficulty: len(queue) for difficulty, queue in self._queues.items()},
+            }
+
+    def _next_to_fill(self):
+        """
+        Pick the difficulty whose queue is the furthest below depth.
+
+        :return: The difficulty to generate next, or None if every queue is full
+        """
+        with self._lock:
+            difficulty, queue = min(self._queues.items(), key=lambda item: len(item[1]))
+            if len(queue) >= self.depth:
+                return None
+            return difficulty
+
+    def _refill_loop(self):
+        """
+        Body of the background thread: generate puzzles until every queue is full, then sleep until woken.
+        """
+        while not self._stopped:
+            self._wake.clear()
+            difficulty = self._next_to_fill()
+            if difficulty is None:
+                self._wake.wait()
+                continue
+            with self._lock:
+                base = self._bases.get(difficulty)
+                if base is not None and self._base_uses[difficulty] >= self.variants:
+                    base = None  # Served enough variants of this puzzle; generate a new one
+            board = generate_sudoku(self.size, difficulty, unique=True, grade=DIFFICULTY_GRADES.get(difficulty),
+                                    rng=self._rng, base=base, with_solution=True)
+            with self._lock:
+                if base is None:
+                    self._bases[difficulty] = board
+                    self._base_uses[difficulty] = 1
+                else:
+                    self._base_uses[difficulty] += 1
+                self._queues[difficulty].append(board)
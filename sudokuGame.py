@@ -1,26 +1,218 @@
 import pygame
 import sys
-from sudoku_generator import generate_sudoku
+import time
 from constant import *
-import copy
+from game_session import GameSession
+import instrumentation
+
+
+class GlyphCache:
+    """
+    Cache of loaded fonts and rendered text surfaces, so drawing a frame only needs blits.
+    Fonts are loaded on first use, after pygame has been initialized.
+    """
+    def __init__(self):
+        self._fonts = {}  # Font size -> pygame.font.Font
+        self._surfaces = {}  # (font size, text, color, antialias) -> rendered surface
+        self._digits = {}  # (number, color) -> pre-rendered digit surface for cells
+        self._pencil_marks = None  # Digit -> (surface, offset inside a cell), rendered on first use
+
+    def font(self, size: int):
+        """
+        Get the default font at the given size, loading it once.
+
+        :param size: Font size
+        :return: pygame.font.Font
+        """
+        font = self._fonts.get(size)
+        if font is None:
+            font = self._fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    def text(self, size: int, text: str, color: tuple, antialias: bool = False):
+        """
+        Get a rendered text surface, rendering it once.
+
+        :param size: Font size
+        :param text: Text to render
+        :param color: RGB color tuple of the text
+        :param antialias: Whether to render with antialiasing
+        :return: pygame.Surface with the rendered text
+        """
+        key = (size, text, color, antialias)
+        surface = self._surfaces.get(key)
+        if surface is None:
+            surface = self._surfaces[key] = self.font(size).render(text, antialias, color)
+        return surface
+
+    def digit(self, number: int, color: tuple):
+        """
+        Get the surface of a cell number. Digits 1-9 are rendered in all number colors on first use.
+
+        :param number: Number in the cell (1-9)
+        :param color: One of NUM_COLOR_BLACK, NUM_COLOR_BLUE, NUM_COLOR_RED
+        :return: pygame.Surface with the rendered digit
+        """
+        if not self._digits:
+            for num_color in (NUM_COLOR_BLACK, NUM_COLOR_BLUE, NUM_COLOR_RED):
+                for num in range(1, 10):
+                    self._digits[num, num_color] = self.text(NUM_FONT, str(num), num_color, True)
+        surface = self._digits.get((number, color))
+        if surface is None:
+            surface = self._digits[number, color] = self.text(NUM_FONT, str(number), color, True)
+        return surface
+
+
+    def pencil_marks(self):
+        """
+        Get the small candidate digits 1-9 with their positions in a 3x3 grid inside a cell, rendering them once.
+
+        :return: List indexed by digit of (pygame.Surface, (x, y) offset of its top left corner in the cell)
+        """
+        if self._pencil_marks is None:
+            self._pencil_marks = [None]
+            for num in range(1, 10):
+                surface = self.text(PENCIL_MARK_FONT, str(num), PENCIL_MARK_COLOR, True)
+                center = (SQUARE_SIZE * (2 * ((num - 1) % 3) + 1) // 6, SQUARE_SIZE * (2 * ((num - 1) // 3) + 1) // 6)
+                self._pencil_marks.append((surface, surface.get_rect(center=center).topleft))
+        return self._pencil_marks
+
+
+class EventLoop:
+    """
+    Main loop shared by every screen. It blocks on pygame.event.wait() while idle, caps the frame rate with
+    a pygame.time.Clock, and measures loop iterations per second and process CPU usage.
+    """
+    def __init__(self, max_fps: int = MAX_FPS, idle_timeout: int = IDLE_TIMEOUT):
+        """
+        :param max_fps: Upper bound on loop iterations per second
+        :param idle_timeout: Longest time, in milliseconds, to block waiting for an event
+        """
+        self.max_fps = max_fps
+        self.idle_timeout = idle_timeout
+        self.clock = pygame.time.Clock()
+        self.fps = 0.0  # Loop iterations per second, measured over the last second
+        self.cpu_percent = 0.0  # Process CPU time as a percentage of wall time, measured over the last second
+        self._frames = 0
+        self._window_start = time.perf_counter()
+        self._window_cpu = time.process_time()
+
+    def run(self, handle_event, update=None):
+        """
+        Run the loop until a callback returns something other than None.
+
+        Each iteration calls update() (e.g. to redraw and check for a win), then blocks until at least one
+        event arrives or idle_timeout passes, and passes every pending event to handle_event(event).
+
+        :param handle_event: Function called with each pygame event
+        :param update: Optional function called once per iteration, before waiting for events
+        :return: The first value other than None returned by a callback
+        """
+        capped = False  # The first pass of a new screen is not delayed by the frame cap
+        while True:
+            if update is not None:
+                result = update()
+                if result is not None:
+                    return result
+            self.clock.tick(self.max_fps if capped else 0)  # Sleep if the loop runs faster than max_fps
+            capped = True
+            self._count_frame()
+
+            event = pygame.event.wait(self.idle_timeout)  # Sleep until input arrives
+            if event.type == pygame.NOEVENT:
+                continue
+            for event in [event] + pygame.event.get():
+                if instrumentation.enabled:
+                    instrumentation.count("events_handled")
+                result = handle_event(event)
+                if result is not None:
+                    return result
+
+    def _count_frame(self):
+        """
+        Count one loop iteration and refresh fps and cpu_percent once per second.
+        """
+        self._frames += 1
+        now = time.perf_counter()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            cpu = time.process_time()
+            self.fps = self._frames / elapsed
+            self.cpu_percent = (cpu - self._window_cpu) / elapsed * 100
+            self._frames = 0
+            self._window_start = now
+            self._window_cpu = cpu
+
+
+class AppContext:
+    """
+    The window and everything the screens share: the display surface, the glyph cache, the event loop with its
+    clock, and the static background of the game screen. pygame is initialized and the window is created once,
+    here, so moving between the start, game and game-over screens only redraws.
+    """
+    def __init__(self):
+        pygame.display.init()  # Only what the game uses; pygame.init() would also start audio and joysticks
+        pygame.font.init()
+        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))  # Creates the window
+        pygame.display.set_caption("Sudoku")
+        self.glyphs = GlyphCache()  # Surfaces belong to this window's screens only
+        self.loop = EventLoop()
+        self.game_background = None  # Grid and buttons of the game screen, drawn by the first SudokuGame
+
+
+_app = None  # AppContext shared by every screen, created by app_context()
+
+
+def app_context():
+    """
+    :return: The AppContext of the process, creating the window on first use
+    """
+    global _app
+    if _app is None:
+        _app = AppContext()
+    return _app
 
 
 class SudokuGame:
-    def __init__(self, remove_size: int):
+    """
+    Pygame front end of a Sudoku game. The game state and rules live in a GameSession; this class draws it
+    and turns mouse clicks and key presses into session moves.
+    """
+    def __init__(self, remove_size: int, puzzle_pool=None, show_conflicts: bool = SHOW_CONFLICTS, puzzle=None,
+                 show_errors: bool = SHOW_ERRORS, session: GameSession = None, save_path: str = None,
+                 app: AppContext = None, show_candidates: bool = SHOW_CANDIDATES):
         """
         Initialize the Sudoku Game
 
         :param remove_size: Difficulty of the Sudoku game
+        :param puzzle_pool: Optional PuzzlePool to take the puzzle from instead of generating it here
+        :param show_conflicts: Whether to highlight numbers repeated in a row, column or box
+        :param puzzle: Optional Board to play, e.g. an entry of a puzzle archive; skips the generator and pool
+        :param show_errors: Whether to highlight committed numbers that differ from the solution
+        :param session: Optional GameSession to continue, e.g. one resumed with GameSession.load
+        :param save_path: Optional file the unfinished game is saved to when the window is closed
+        :param app: AppContext to draw into (default: the shared one)
+        :param show_candidates: Whether to show the candidates (pencil marks) of empty cells
         """
-        pygame.init()
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        self.selected_cell = []
-        self.is_full = False
-        self.sudoku_board = generate_sudoku(9, remove_size)
-        self.answer_board = copy.deepcopy(self.sudoku_board)
-        self.temp_board = [[0 for _ in range(9)] for _ in range(9)]
-
-        pygame.display.set_caption("Sudoku")
+        self.app = app if app is not None else app_context()
+        self.screen = self.app.screen
+        if session is not None:
+            self.session = session
+        elif puzzle is not None:
+            self.session = GameSession(puzzle)
+        else:
+            self.session = GameSession.new(remove_size, puzzle_pool)
+        self.show_conflicts = show_conflicts
+        self.show_errors = show_errors
+        self.save_path = save_path
+        self.show_candidates = show_candidates
+        self.session.track_candidates(show_candidates)
+        self.full_redraw = True  # Whether the whole window must be redrawn on the next screen update
+
+        if self.app.game_background is None:
+            self.app.game_background = self._draw_background()  # Static grid and buttons, drawn once per window
+        self.background = self.app.game_background
+        self.loop = self.app.loop
 
     def draw_grid(self):
         """
@@ -80,99 +272,119 @@ class SudokuGame:
         """
         Main loop for running Sudoku game
 
-        :return: Winning status of the game. If win return True, if full but not win return False
+        :return: GAME_WIN, GAME_SOLVED if S or H finished the board, GAME_LOSE if it is full but not won, or
+                 GAME_RESTART
         """
-        while True:
-            restart = self._check_event()  # Check mouse clicks or key presses
-            if restart:
-                # If the restart button is clicked
-                return GAME_RESTART  # Restart the game
-            self._update_screen()  # Update the game screen
-            if self._check_win():  # Check if win the game, return True when winning
-                return GAME_WIN
-            elif self.is_full:  # If the board is full but didn't win, return False
-                return GAME_LOSE
+        return self.loop.run(self._check_event, self._update_game)
+
+    def _update_game(self):
+        """
+        Called once per loop iteration: redraw what changed and check whether the game is over.
 
-    def _check_event(self):
+        :return: GAME_WIN, GAME_SOLVED or GAME_LOSE if the game is over, None otherwise
         """
-        Check events (e.g., mouse clicks, key presses).
+        self._update_screen()  # Update the game screen
+        return self.session.status()  # GAME_WIN, GAME_SOLVED if S or H finished it, GAME_LOSE, None while playing
+
+    def _check_event(self, event):
         """
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:  # If a quit event is detected,
-                sys.exit()  # Exit the program
-            elif event.type == pygame.MOUSEBUTTONDOWN:  # If a mouse button is pressed,
-                return self._handle_mouse_click(event)  # Handle the mouse click event
-            elif event.type == pygame.KEYDOWN and self.selected_cell:  # If a key is pressed and a cell is selected,
-                self._handle_key_click(event)  # Handle the key press event
-                return False
+        Check one event (e.g., mouse click, key press).
+
+        :param event: The pygame event to handle
+        :return: GAME_RESTART if the restart button is clicked, None otherwise
+        """
+        if event.type == pygame.QUIT:  # If a quit event is detected,
+            self._save()
+            sys.exit()  # Exit the program
+        elif event.type == pygame.MOUSEBUTTONDOWN:  # If a mouse button is pressed,
+            if self._handle_mouse_click(event):  # Handle the mouse click event
+                return GAME_RESTART  # Restart the game
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_h:  # H fills in one correct number
+            self.session.hint()
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_s:  # S shows the solution; not a win
+            self.session.solve()
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_c:  # C toggles the pencil marks
+            self.show_candidates = not self.show_candidates
+            self.session.track_candidates(self.show_candidates)
+        elif (event.type == pygame.KEYDOWN and event.key in (pygame.K_z, pygame.K_y)
+              and pygame.key.get_mods() & pygame.KMOD_CTRL):
+            if event.key == pygame.K_y or pygame.key.get_mods() & pygame.KMOD_SHIFT:  # Ctrl+Y or Ctrl+Shift+Z redoes
+                self.session.redo()
+            else:  # Ctrl+Z undoes the last change to the answer board
+                self.session.undo()
+        elif event.type == pygame.KEYDOWN and self.session.selected_cell:  # If a key is pressed and a cell is selected,
+            self._handle_key_click(event)  # Handle the key press event
+        elif event.type == pygame.WINDOWEXPOSED:  # If the window needs repainting (e.g. after being restored),
+            self.full_redraw = True
+        return None
 
     def _update_screen(self):
         """
         Update the display screen with the current state of the Sudoku game.
+        Only cells marked dirty are redrawn, and nothing is drawn if no state has changed.
+        """
+        session = self.session
+        if self.full_redraw or session.board_changed or (self.show_conflicts and session.conflicts_changed):
+            self.screen.blit(self.background, (0, 0))  # Restore the grid and buttons
+            for row in range(BOARD_ROWS):
+                for col in range(BOARD_COLS):
+                    self._draw_cell(row, col)
+            pygame.display.flip()
+            if instrumentation.enabled:
+                instrumentation.count("frames_drawn.full")
+        elif session.changed_cells:
+            dirty_rects = [self._draw_cell(row, col) for row, col in session.changed_cells]
+            pygame.display.update(dirty_rects)  # Only push the changed cells to the window
+            if instrumentation.enabled:
+                instrumentation.count("frames_drawn.partial")
+        self.full_redraw = False
+        session.clear_changes()
+
+    def _draw_background(self):
+        """
+        Draw the parts of the screen that never change (background color, grid and buttons).
+
+        :return: A copy of the drawn screen, used to repaint cells
         """
         self.screen.fill(BG_COLOR)  # Clear the screen with the background color
         self.draw_grid()  # Draw the Sudoku grid
         self.draw_button()  # Draw the action buttons
-        for row in range(BOARD_ROWS):
-            for col in range(BOARD_COLS):
-                # Draw numbers from sudoku_board, answer_board, and temp_board
-                if self.sudoku_board[row][col] != 0:
-                    self._draw_number(str(self.sudoku_board[row][col]), row, col, NUM_COLOR_BLACK)
-                    continue  # If not continue, all cells would be drawn as an answer number
-                if self.answer_board[row][col] != 0:
-                    self._draw_number(str(self.answer_board[row][col]), row, col, NUM_COLOR_BLUE)
-                if self.temp_board[row][col] != 0:
-                    self._draw_number(str(self.temp_board[row][col]), row, col, NUM_COLOR_RED)
-
-        if self.selected_cell:  # Draw a border around the selected cell
-            self._draw_selected_cell_border()
-        pygame.display.flip()
+        return self.screen.copy()
 
-    def _check_win(self):
+    def _draw_cell(self, row: int, col: int):
         """
-        Check if the game is won.
+        Repaint one cell: its background and grid lines, its number and, if selected, its border.
 
-        :return: True if the game is won (all cells are filled and no duplicate numbers are found), False otherwise.
+        :param row: The row index of the cell
+        :param col: The column index of the cell
+        :return: The screen rectangle covered by the cell
         """
-        # Check if the answer board is full
-        for row in range(BOARD_ROWS):
-            for col in range(BOARD_COLS):
-                # Check if the cell is empty
-                if self.answer_board[row][col] != 0:
-                    continue
-                else:
-                    return False
-        self.is_full = True
-
-        # Check rows and columns for duplicates
-        for i in range(BOARD_ROWS):
-            row_set = set()
-            col_set = set()
-            for j in range(BOARD_COLS):
-                # Check for duplicate numbers in rows
-                if self.answer_board[i][j] != 0:
-                    if self.answer_board[i][j] in row_set:
-                        return False
-                    row_set.add(self.answer_board[i][j])
-
-                # Check for duplicate numbers in columns
-                if self.answer_board[j][i] != 0:
-                    if self.answer_board[j][i] in col_set:
-                        return False
-                    col_set.add(self.answer_board[j][i])
-
-        # Check 3x3 box for duplicates
-        for i in range(0, BOARD_ROWS, 3):
-            for j in range(0, BOARD_COLS, 3):
-                box_set = set()
-                for m in range(3):
-                    for n in range(3):
-                        num = self.answer_board[i + m][j + n]
-                        if num != 0:
-                            if num in box_set:
-                                return False
-                            box_set.add(num)
-        return True
+        cell_rect = pygame.Rect(col * SQUARE_SIZE + EDGE_BLANK, row * SQUARE_SIZE + EDGE_BLANK,
+                                SQUARE_SIZE, SQUARE_SIZE)
+        self.screen.blit(self.background, cell_rect, cell_rect)  # Erase the cell
+        session = self.session
+        tint = None
+        if self.show_errors and session.is_wrong(row, col):
+            tint = WRONG_CELL_COLOR
+        elif self.show_conflicts and session.answer_counts.has_conflict(row, col):
+            tint = CONFLICT_CELL_COLOR
+        if tint is not None:
+            # Tint the inside of the cell, leaving the grid lines visible
+            inner_rect = cell_rect.inflate(-2 * BOX_LINE_WIDTH, -2 * BOX_LINE_WIDTH)
+            pygame.draw.rect(self.screen, tint, inner_rect)
+        # Draw numbers from sudoku_board, answer_board, and temp_board
+        if session.sudoku_board[row, col] != 0:
+            self._draw_number(session.sudoku_board[row, col], row, col, NUM_COLOR_BLACK)
+        else:  # If not else, all cells would be drawn as an answer number
+            if session.answer_board[row, col] != 0:
+                self._draw_number(session.answer_board[row, col], row, col, NUM_COLOR_BLUE)
+            if session.temp_board[row, col] != 0:
+                self._draw_number(session.temp_board[row, col], row, col, NUM_COLOR_RED)
+            elif self.show_candidates and session.answer_board[row, col] == 0:
+                self._draw_pencil_marks(session.pencil_marks.candidates(row, col), cell_rect)
+        if session.selected_cell == [row, col]:  # Draw a border around the selected cell
+            self._draw_selected_cell_border()
+        return cell_rect
 
     def _handle_mouse_click(self, event):
         """
@@ -194,29 +406,34 @@ class SudokuGame:
                     return True
                 elif 360 < x < 460:
                     # If the click is within the RESET button, reset the board
-                    self.answer_board = copy.deepcopy(self.sudoku_board)
-                    self.temp_board = [[0 for _ in range(9)] for _ in range(9)]
+                    self.session.reset()
                     return False
                 elif 560 < x < 660:
                     # If the click is within the EXIT button, quit the game
+                    self._save()
                     pygame.quit()
                     sys.exit()
             return False
 
-        # If a cell within the Sudoku grid is clicked, update the answer_board with the value from temp_board
-        # for the selected cell
-        self._auto_update_number()
+        # If a cell within the Sudoku grid is clicked, select it. This also commits the temporary number
+        # of the previously selected cell
+        self.session.select(row, col)
 
-        # Update the selected_cell attribute with the clicked cell coordinates
-        self.selected_cell = [row, col]
+    def _save(self):
+        """
+        Save the session to save_path, if set and the game is not over, so it can be resumed.
+        """
+        if self.save_path is not None and self.session.status() is None:
+            self.session.save(self.save_path)
 
     def _draw_selected_cell_border(self):
         """
         Draw a border around the selected cell.
         """
-        if self.selected_cell:
-            x = self.selected_cell[1] * SQUARE_SIZE + EDGE_BLANK  # Calculate the x-coordinate of the selected cell
-            y = self.selected_cell[0] * SQUARE_SIZE + EDGE_BLANK  # Calculate the y-coordinate of the selected cell
+        selected_cell = self.session.selected_cell
+        if selected_cell:
+            x = selected_cell[1] * SQUARE_SIZE + EDGE_BLANK  # Calculate the x-coordinate of the selected cell
+            y = selected_cell[0] * SQUARE_SIZE + EDGE_BLANK  # Calculate the y-coordinate of the selected cell
             # Draw a rectangle around the selected cell with the specified color and thickness
             pygame.draw.rect(self.screen, CELL_SELECTED_COLOR, pygame.Rect(x, y, SQUARE_SIZE, SQUARE_SIZE), 3)
 
@@ -226,57 +443,25 @@ class SudokuGame:
 
         :param event:The pygame key event containing the key press information.
         """
-        row = self.selected_cell[0]  # Get the row index of the selected cell
-        col = self.selected_cell[1]  # Get the column index of the selected cell
-
-        # Handle arrow keys event
+        # Handle arrow keys event: commit the temporary number and move the selection
         if event.key == pygame.K_UP:
-            if row > 0:
-                self._auto_update_number()
-                self.selected_cell[0] -= 1
+            self.session.move(-1, 0)
         elif event.key == pygame.K_DOWN:
-            if row < 8:
-                self._auto_update_number()
-                self.selected_cell[0] += 1
+            self.session.move(1, 0)
         elif event.key == pygame.K_LEFT:
-            if col > 0:
-                self._auto_update_number()
-                self.selected_cell[1] -= 1
+            self.session.move(0, -1)
         elif event.key == pygame.K_RIGHT:
-            if col < 8:
-                self._auto_update_number()
-                self.selected_cell[1] += 1
-
-        # Handle entering number event
-        # Check if the selected cell is empty in both the sudoku_board and answer_board
-        if self.sudoku_board[row][col] == 0 and self.answer_board[row][col] == 0:
-            # Check if the pressed key corresponds to a number (0-9)
-            if pygame.K_0 <= event.key <= pygame.K_9:
-                # Update the temp_board with the entered number for the selected cell
-                self.temp_board[row][col] = int(pygame.key.name(event.key))
-
-            # Check if the pressed key is the RETURN key
-            if event.key == pygame.K_RETURN:
-                # Update the answer_board with the entered number from the temp_board
-                self.answer_board[row][col] = self.temp_board[row][col]
-                # Reset the temp_board for the selected cell to 0
-                self.temp_board[row][col] = 0
-        # Check if the number to be deleted is allowed to be removed
-        elif self.sudoku_board[row][col] == 0 and self.answer_board[row][col] != 0:
-            if event.key == pygame.K_BACKSPACE:
-                # Removed the selected number
-                self.answer_board[row][col] = 0
-                self.temp_board[row][col] = 0
-
-    def _auto_update_number(self):
-        # If a cell is selected by pressing the arrow keys
-        if self.selected_cell and self.answer_board[self.selected_cell[0]][self.selected_cell[1]] == 0:
-            # Update the answer_board with the value from temp_board for the last selected cell
-            self.answer_board[self.selected_cell[0]][self.selected_cell[1]] = (
-                self.temp_board)[self.selected_cell[0]][self.selected_cell[1]]
-            self.temp_board[self.selected_cell[0]][self.selected_cell[1]] = 0
-
-    def _draw_number(self, number: str, row: int, col: int, num_color: tuple):
+            self.session.move(0, 1)
+
+        # Handle entering number event (ignored unless the selected cell is empty)
+        elif pygame.K_0 <= event.key <= pygame.K_9:
+            self.session.set_temp(int(pygame.key.name(event.key)))
+        elif event.key == pygame.K_RETURN:
+            self.session.commit()  # Commit the temporary number to the answer board
+        elif event.key == pygame.K_BACKSPACE:
+            self.session.erase()  # Remove a committed number; given numbers cannot be removed
+
+    def _draw_number(self, number: int, row: int, col: int, num_color: tuple):
         """
         Draw a number onto the Sudoku grid.
 
@@ -285,8 +470,7 @@ class SudokuGame:
         :param col: The column index of the cell where the number will be drawn
         :param num_color: The RGB color tuple for the color of the number
         """
-        num_font = pygame.font.Font(None, NUM_FONT)  # Load the font for rendering the number
-        num_surf = num_font.render(number, True, num_color)  # Render the number onto a surface
+        num_surf = self.app.glyphs.digit(number, num_color)  # Get the pre-rendered number surface
         mid_x = (col * SQUARE_SIZE + EDGE_BLANK) + SQUARE_SIZE / 2  # Calculate the x-coordinate
         mid_y = (row * SQUARE_SIZE + EDGE_BLANK) + SQUARE_SIZE / 2  # Calculate the y-coordinate
         num_rect = num_surf.get_rect(center=(mid_x, mid_y))  # Get the rectangle containing the number surface
@@ -300,21 +484,40 @@ class SudokuGame:
         :param text: The text to be drawn on the screen
         :param text_center: The (x, y) coordinates of the center of the text
         """
-        text_font = pygame.font.Font(None, font)  # Load the font for rendering the text
-        text_surf = text_font.render(text, False, TEXT_COLOR)  # Render the text onto a surface
+        text_surf = self.app.glyphs.text(font, text, TEXT_COLOR)  # Get the cached text surface
         text_rect = text_surf.get_rect(center=text_center)  # Get the rectangle containing the text surface
         self.screen.blit(text_surf, text_rect)  # Draw the text onto the screen at the specified position
 
+    def _draw_pencil_marks(self, candidates: int, cell_rect: pygame.Rect):
+        """
+        Draw the candidates of an empty cell as small digits in a 3x3 grid, from pre-rendered glyphs.
+
+        :param candidates: Bitmask of the candidates (bit n set = digit n)
+        :param cell_rect: Screen rectangle of the cell
+        """
+        marks = self.app.glyphs.pencil_marks()
+        x, y = cell_rect.topleft
+        blits = []
+        while candidates:
+            bit = candidates & -candidates
+            candidates ^= bit
+            surface, (dx, dy) = marks[bit.bit_length() - 1]
+            blits.append((surface, (x + dx, y + dy)))
+        self.screen.blits(blits, doreturn=False)
+
 
 class DisplayStartOver:
     """
     Class to manage display functions for the start and game over screens of a Sudoku game.
     """
-    def __init__(self):
-        # Initializes the game window and sets the default difficulty level.
-        pygame.init()
+    def __init__(self, app: AppContext = None):
+        """
+        :param app: AppContext to draw into (default: the shared one)
+        """
         self.difficulty = MEDIUM  # Sets the default game difficulty to medium
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))  # Creates the window
+        self.app = app if app is not None else app_context()
+        self.screen = self.app.screen
+        self.loop = self.app.loop
 
     def draw_game_start(self):
         """
@@ -325,7 +528,6 @@ class DisplayStartOver:
         self.screen.fill(BG_COLOR)  # Fills the screen with a background color
         start_text = "Welcome  to  Sudoku"
         select_text = "Select  Game  Mode:"
-        running = True
         button_top = SCREEN_HEIGHT - 200
         easy_button_left = SCREEN_WIDTH / 2 - 250
         medium_button_left = SCREEN_WIDTH / 2 - 50
@@ -345,39 +547,42 @@ class DisplayStartOver:
         self._draw_text(GAME_START_FONT, start_text, (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 100))
         self._draw_text(DIFFICULTY_FONT, select_text, (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 200))
 
-        # Event loop to handle input
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    x, y = event.pos
-                    if button_top < y < button_top + BUTTON_HEIGHT:  # 620 - 720
-                        if easy_button_left < x < easy_button_left + BUTTON_WIDTH:
-                            self.difficulty = EASY
-                            running = False
-                        elif medium_button_left < x < medium_button_left + BUTTON_WIDTH:
-                            self.difficulty = MEDIUM
-                            running = False
-                        elif hard_button_left < x < hard_button_left + BUTTON_WIDTH:
-                            self.difficulty = HARD
-                            running = False
-
-            pygame.display.flip()  # Update the display
+        pygame.display.flip()  # Update the display
+
+        def check_event(event):
+            # Return the selected difficulty once a difficulty button is clicked
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                x, y = event.pos
+                if button_top < y < button_top + BUTTON_HEIGHT:  # 620 - 720
+                    if easy_button_left < x < easy_button_left + BUTTON_WIDTH:
+                        return EASY
+                    elif medium_button_left < x < medium_button_left + BUTTON_WIDTH:
+                        return MEDIUM
+                    elif hard_button_left < x < hard_button_left + BUTTON_WIDTH:
+                        return HARD
+            elif event.type == pygame.WINDOWEXPOSED:
+                pygame.display.flip()
+            return None
 
+        # Event loop to handle input
+        self.difficulty = self.loop.run(check_event)
         return self.difficulty
 
-    def draw_game_over(self, is_win: bool):
+    def draw_game_over(self, game_status: int):
         """
         Draws the game over screen.
 
-        :param is_win: True if the player won the game, False otherwise
+        :param game_status: GAME_WIN, GAME_SOLVED (finished with the solve or hint keys) or GAME_LOSE
         """
         self.screen.fill(BG_COLOR)  # Clears the screen with a background color
 
-        if is_win:
+        if game_status == GAME_WIN:
             end_text = "Game  Won!"
+        elif game_status == GAME_SOLVED:
+            end_text = "Solved  with  help"
         else:
             end_text = "Game  Over  :("
 
@@ -389,21 +594,25 @@ class DisplayStartOver:
         self._draw_text(GAME_RESTART_FONT, restart_text, (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 100))
         self._draw_text(GAME_EXIT_FONT, exit_text, (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 200))
 
-        # Handle events and display messages
-        running = True
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
+        pygame.display.flip()
+
+        def check_event(event):
+            # Return True once R is pressed
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
                     pygame.quit()
                     sys.exit()
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        pygame.quit()
-                        sys.exit()
-                    if event.key == pygame.K_r:
-                        return  # Restart the game
+                if event.key == pygame.K_r:
+                    return True  # Restart the game
+            elif event.type == pygame.WINDOWEXPOSED:
+                pygame.display.flip()
+            return None
 
-            pygame.display.flip()
+        # Handle events and display messages
+        self.loop.run(check_event)
 
     def _draw_text(self, font: int, text: str, text_center: tuple):
         """
@@ -413,7 +622,9 @@ class DisplayStartOver:
         :param text: The text to be drawn on the screen
         :param text_center: The (x, y) coordinates of the center of the text
         """
-        text_font = pygame.font.Font(None, font)  # Load the font for rendering the text
-        text_surf = text_font.render(text, False, TEXT_COLOR)  # Render the text onto a surface
+        text_surf = self.app.glyphs.text(font, text, TEXT_COLOR)  # Get the cached text surface
         text_rect = text_surf.get_rect(center=text_center)  # Get the rectangle containing the text surface
         self.screen.blit(text_surf, text_rect)  # Draw the text onto the screen at the specified position
+
+
+instrumentation.instrument(SudokuGame, "_update_screen", "_check_event")
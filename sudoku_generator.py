@@ -1,43 +1,93 @@
 import math
 import random
 
+from board import Board
+from sudoku_grader import GRADE_NAMES, grade as grade_puzzle
+import instrumentation
+import sudoku_solver
+from sudoku_symmetry import random_transform, random_variant
+from constant import GRADE_ATTEMPTS, GRADE_EXPERT, UNIQUE_CHECK_NODES
+
 """
 This was adapted from a GeeksforGeeks article "Program for Sudoku Generator" by Aarti_Rathi and Ankur Trisal
 https://www.geeksforgeeks.org/program-sudoku-generator/
 
 """
 
+'''
+Returns the source of randomness for a generator
+A seed gives a private random.Random, so the same seed always regenerates the same puzzle and
+generators in different threads or processes never share state. Without one, the global random
+module is used, as before
+
+Parameters:
+rng is None, an int seed, or a random.Random instance (returned as is)
+
+Return: random.Random or the random module
+'''
+
+
+def make_rng(rng=None):
+    if rng is None:
+        return random
+    if isinstance(rng, int):
+        return random.Random(rng)
+    return rng
+
+
 class SudokuGenerator:
     '''
 	create a sudoku board - initialize class variables and set up the 2D board
 	This should initialize:
 	self.row_length		- the length of each row
 	self.removed_cells	- the total number of cells to be removed
-	self.board			- a 2D list of ints to represent the board
+	self.board			- a Board (flat row_length * row_length byte grid) to represent the board
 	self.box_length		- the square root of row_length
+	self.row_masks		- a bitmask per row of the digits already placed in it
+	self.col_masks		- a bitmask per column of the digits already placed in it
+	self.box_masks		- a bitmask per box of the digits already placed in it
+	self.rng			- the source of randomness for filling and removing cells (see make_rng)
 
 	Parameters:
-    row_length is the number of rows/columns of the board (always 9 for this project)
+    row_length is the number of rows/columns of the board; it must be a perfect square (9, 16, 25, ...)
     removed_cells is an integer value - the number of cells to be removed
+    rng is an optional seed (int) or random.Random instance; the same seed always produces the same board
 
 	Return:
 	None
     '''
-    def __init__(self, row_length, removed_cells):
+    def __init__(self, row_length, removed_cells, rng=None):
         self.row_length = row_length
         self.removed_cells = removed_cells
-        self.board = [[0 for _ in range(9)] for _ in range(9)]
-        self.box_length = int(math.sqrt(self.row_length))
+        self.rng = make_rng(rng)
+        self.board = Board(self.row_length)
+        self.solution = None  # Copy of the full grid, kept by fill_values before cells are removed
+        self.box_length = math.isqrt(self.row_length)
+        if self.box_length < 2 or self.box_length * self.box_length != self.row_length:
+            raise ValueError(f"row_length must be a square of at least 4, got {row_length}")
+        # Bit n of a mask is set when digit n is already used in that row/column/box
+        self.row_masks = [0] * self.row_length
+        self.col_masks = [0] * self.row_length
+        self.box_masks = [0] * self.row_length
 
     '''
-	Returns a 2D python list of numbers which represents the board
+	Returns the Board which represents the board
 
 	Parameters: None
-	Return: list[list]
+	Return: Board
     '''
     def get_board(self):
         return self.board
 
+    '''
+	Returns the full grid the puzzle was made from
+
+	Parameters: None
+	Return: Board (None until fill_values has been called)
+    '''
+    def get_solution(self):
+        return self.solution
+
 
     '''
 	Displays the board to the console
@@ -48,7 +98,7 @@ class SudokuGenerator:
     '''
     def print_board(self):
         for i in range(self.row_length):
-            print(self.board[i])
+            print(list(self.board.row(i)))
 
     '''
 	Determines if num is contained in the specified row (horizontal) of the board
@@ -61,11 +111,7 @@ class SudokuGenerator:
 	Return: boolean
     '''
     def valid_in_row(self, row, num):
-        for i in range(9):
-            if num == self.board[row][i]:
-                return False
-
-        return True
+        return not self.row_masks[row] >> num & 1
 
 
     '''
@@ -79,30 +125,33 @@ class SudokuGenerator:
 	Return: boolean
     '''
     def valid_in_col(self, col, num):
-        for i in range(9):
-            if num == self.board[i][col]:
-                return False
-
-        return True
+        return not self.col_masks[col] >> num & 1
 
     '''
-	Determines if num is contained in the 3x3 box specified on the board
+	Determines if num is contained in the box_length x box_length box specified on the board
     If num is in the specified box starting at (row_start, col_start), return False.
     Otherwise, return True
 
 	Parameters:
 	row_start and col_start are the starting indices of the box to check
-	i.e. the box is from (row_start, col_start) to (row_start+2, col_start+2)
+	i.e. the box is from (row_start, col_start) to (row_start+box_length-1, col_start+box_length-1)
 	num is the value we are looking for in the box
 
 	Return: boolean
     '''
     def valid_in_box(self, row_start, col_start, num):
-        for i in range(3):
-            for j in range(3):
-                if self.board[row_start + i][col_start + j] == num:
-                    return False
-        return True
+        return not self.box_masks[self.box_index(row_start, col_start)] >> num & 1
+
+    '''
+    Returns the index of the box containing (row, col), counting boxes left to right, top to bottom
+
+	Parameters:
+	row and col are the row index and col index of a cell in the board
+
+	Return: int
+    '''
+    def box_index(self, row, col):
+        return (row // self.box_length) * self.box_length + col // self.box_length
 
     
     '''
@@ -116,46 +165,81 @@ class SudokuGenerator:
 	Return: boolean
     '''
     def is_valid(self, row, col, num):
-        row_start = (row // 3) * 3
-        col_start = (col // 3) * 3
-        return (self.valid_in_row(row, num) and self.valid_in_col(col, num) and
-                self.valid_in_box(row_start, col_start, num))
+        used = self.row_masks[row] | self.col_masks[col] | self.box_masks[self.box_index(row, col)]
+        return not used >> num & 1
+
+    '''
+    Writes num into the empty cell (row, col) and marks it as used in the cell's row, column and box
+    The caller is responsible for checking is_valid first
+
+	Parameters:
+	row and col are the row index and col index of the cell
+	num is the value to place
+
+	Return: None
+    '''
+    def place(self, row, col, num):
+        bit = 1 << num
+        self.board[row, col] = num
+        self.row_masks[row] |= bit
+        self.col_masks[col] |= bit
+        self.box_masks[self.box_index(row, col)] |= bit
+
+    '''
+    Clears the cell (row, col) and releases its value in the cell's row, column and box
+    Undoes a previous call to place
+
+	Parameters:
+	row and col are the row index and col index of the cell
+
+	Return: None
+    '''
+    def unplace(self, row, col):
+        bit = ~(1 << self.board[row, col])
+        self.board[row, col] = 0
+        self.row_masks[row] &= bit
+        self.col_masks[col] &= bit
+        self.box_masks[self.box_index(row, col)] &= bit
 
 
     '''
-    Fills the specified 3x3 box with values
+    Fills the specified box_length x box_length box with values
     For each position, generates a random digit which has not yet been used in the box
 
 	Parameters:
 	row_start and col_start are the starting indices of the box to check
-	i.e. the box is from (row_start, col_start) to (row_start+2, col_start+2)
+	i.e. the box is from (row_start, col_start) to (row_start+box_length-1, col_start+box_length-1)
 
 	Return: None
     '''
     def fill_box(self, row_start, col_start):
-        num_list = list(range(1, 10))
-        random.shuffle(num_list)
+        num_list = list(range(1, self.row_length + 1))
+        self.rng.shuffle(num_list)
 
-        for i in range(3):
-            for j in range(3):
-                self.board[row_start + i][col_start + j] = num_list.pop()
+        for i in range(self.box_length):
+            for j in range(self.box_length):
+                self.place(row_start + i, col_start + j, num_list.pop())
     
     '''
-    Fills the three boxes along the main diagonal of the board
-    These are the boxes which start at (0,0), (3,3), and (6,6)
+    Fills the boxes along the main diagonal of the board
+    For a 9x9 board these are the boxes which start at (0,0), (3,3), and (6,6)
 
 	Parameters: None
 	Return: None
     '''
     def fill_diagonal(self):
-        for i in range(0, 9, 3):
+        for i in range(0, self.row_length, self.box_length):
             self.fill_box(i, i)
 
     '''
-    DO NOT CHANGE
-    Provided for students
     Fills the remaining cells of the board
     Should be called after the diagonal boxes have been filled
+    The empty cells are visited in a fixed row-major order computed up front, with an explicit stack of the
+    untried candidates of each visited cell instead of one recursive call per cell, so the depth is not
+    limited by Python's recursion limit. Candidates are tried in random order so the filled board is not
+    biased towards small digits in the top rows; the result only depends on the state of self.rng
+    fill_values uses fill_remaining_mrv instead, whose worst case is far shorter; this filler is kept as the
+    recursion-free alternative
 	
 	Parameters:
 	row, col specify the coordinates of the first empty (0) cell
@@ -164,43 +248,105 @@ class SudokuGenerator:
 	boolean (whether or not we could solve the board)
     '''
     def fill_remaining(self, row, col):
-        if (col >= self.row_length and row < self.row_length - 1):
-            row += 1
-            col = 0
-        if row >= self.row_length and col >= self.row_length:
+        size = self.row_length
+        cells = self.board.cells
+        order = [cell for cell in range(row * size + col, size * size) if cells[cell] == 0]
+        if not order:
             return True
-        if row < self.box_length:
-            if col < self.box_length:
-                col = self.box_length
-        elif row < self.row_length - self.box_length:
-            if col == int(row // self.box_length * self.box_length):
-                col += self.box_length
-        else:
-            if col == self.row_length - self.box_length:
-                row += 1
-                col = 0
-                if row >= self.row_length:
-                    return True
-        
-        for num in range(1, self.row_length + 1):
-            if self.is_valid(row, col, num):
-                self.board[row][col] = num
-                if self.fill_remaining(row, col + 1):
-                    return True
-                self.board[row][col] = 0
+        # Local names for the hot loop; this inlines place/unplace
+        rows = [cell // size for cell in order]
+        cols = [cell % size for cell in order]
+        boxes = [self.box_index(row, col) for row, col in zip(rows, cols)]
+        row_masks, col_masks, box_masks = self.row_masks, self.col_masks, self.box_masks
+        digits = range(1, size + 1)
+        shuffle = self.rng.shuffle
+
+        stack = []  # stack[depth] is the list of untried candidates of order[depth]
+        depth = 0
+        backtracks = 0
+        tests = size  # Candidate digits tested against the masks, the inlined equivalent of is_valid calls
+        used = row_masks[rows[0]] | col_masks[cols[0]] | box_masks[boxes[0]]
+        candidates = [num for num in digits if not used >> num & 1]
+        shuffle(candidates)
+        stack.append(candidates)
+        while stack:
+            depth = len(stack) - 1
+            cell, row, col, box = order[depth], rows[depth], cols[depth], boxes[depth]
+            if cells[cell]:  # Undo the previous attempt at this depth
+                bit = ~(1 << cells[cell])
+                cells[cell] = 0
+                row_masks[row] &= bit
+                col_masks[col] &= bit
+                box_masks[box] &= bit
+            candidates = stack[-1]
+            if not candidates:
+                stack.pop()
+                backtracks += 1
+                continue
+            num = candidates.pop()
+            bit = 1 << num
+            cells[cell] = num
+            row_masks[row] |= bit
+            col_masks[col] |= bit
+            box_masks[box] |= bit
+            depth += 1
+            if depth == len(order):
+                if instrumentation.enabled:
+                    instrumentation.count("fill_remaining.backtracks", backtracks)
+                    instrumentation.count("fill_remaining.candidate_tests", tests)
+                return True
+            used = row_masks[rows[depth]] | col_masks[cols[depth]] | box_masks[boxes[depth]]
+            candidates = [num for num in digits if not used >> num & 1]
+            tests += size
+            shuffle(candidates)
+            stack.append(candidates)
+        if instrumentation.enabled:
+            instrumentation.count("fill_remaining.backtracks", backtracks)
+            instrumentation.count("fill_remaining.candidate_tests", tests)
         return False
 
     '''
-    DO NOT CHANGE
-    Provided for students
-    Constructs a solution by calling fill_diagonal and fill_remaining
+    Fills the remaining cells of the board in a random valid way, for boards of any size
+    Uses the constraint-propagation solver (bitmask candidates, naked/hidden singles and MRV branching,
+    see sudoku_solver.py) with the candidates of each branching cell tried in random order
+    Should be called after the diagonal boxes have been filled
+
+	Parameters: None
+
+	Return:
+	boolean (whether or not we could solve the board)
+    '''
+    def fill_remaining_mrv(self):
+        solution = sudoku_solver.solve(self.board, self.rng.shuffle)
+        if solution is None:
+            return False
+        for row in range(self.row_length):
+            for col in range(self.row_length):
+                if self.board[row, col] == 0:
+                    self.place(row, col, solution[row, col])
+        return True
+
+    '''
+    Constructs a solution by calling fill_diagonal and fill_remaining_mrv
+    The row-by-row backtracking of fill_remaining is faster on a typical 9x9 board but has a heavy tail
+    (a few boards in a hundred take 50 ms or more) and does not finish in reasonable time at 16x16 and above
+    On 4x4 boards the two diagonal boxes leave no valid completion about half the time; the board is then
+    cleared and filled again
+    The full grid is saved as the solution, see get_solution
 
 	Parameters: None
 	Return: None
     '''
     def fill_values(self):
-        self.fill_diagonal()
-        self.fill_remaining(0, self.box_length)
+        while True:
+            self.fill_diagonal()
+            if self.fill_remaining_mrv():
+                self.solution = self.board.copy()
+                return
+            self.board.clear()
+            self.row_masks = [0] * self.row_length
+            self.col_masks = [0] * self.row_length
+            self.box_masks = [0] * self.row_length
 
     '''
     Removes the appropriate number of cells from the board
@@ -211,40 +357,150 @@ class SudokuGenerator:
     NOTE: Be careful not to 'remove' the same cell multiple times
     i.e. if a cell is already 0, it cannot be removed again
 
-	Parameters: None
+    If unique is True, a cell is only removed when the puzzle still has exactly one solution afterwards.
+    Cells are tried in random order, so fewer than removed_cells may be cleared if no further cell
+    can be removed without making the puzzle ambiguous
+
+	Parameters:
+	unique is a boolean - whether the remaining puzzle must have a unique solution
+
 	Return: None
     '''
-    def remove_cells(self):
+    def remove_cells(self, unique=False):
+        if unique:
+            self.remove_cells_unique()
+            return
         count = self.removed_cells
         while count > 0:
-            row = random.randint(0, self.row_length - 1)
-            col = random.randint(0, self.row_length - 1)
-            if self.board[row][col] != 0:
-                self.board[row][col] = 0
+            row = self.rng.randint(0, self.row_length - 1)
+            col = self.rng.randint(0, self.row_length - 1)
+            if self.board[row, col] != 0:
+                self.unplace(row, col)
+                count -= 1
+
+    '''
+    Removes up to removed_cells cells while keeping the solution unique
+    Each filled cell is cleared in random order and put back if the board then has a second solution
+    A check that needs more than UNIQUE_CHECK_NODES search nodes also puts the cell back; this bounds the
+    worst case on 16x16 and 25x25 boards, where a few checks can otherwise take seconds
+
+	Parameters: None
+	Return: None
+    '''
+    def remove_cells_unique(self):
+        cells = [(row, col) for row in range(self.row_length) for col in range(self.row_length)
+                 if self.board[row, col] != 0]
+        self.rng.shuffle(cells)
+        count = self.removed_cells
+        retries = 0
+        for row, col in cells:
+            if count == 0:
+                break
+            num = self.board[row, col]
+            self.unplace(row, col)
+            if self.count_solutions(2, UNIQUE_CHECK_NODES) == 1:
                 count -= 1
+            else:
+                self.place(row, col, num)
+                retries += 1
+        if instrumentation.enabled:
+            instrumentation.count("remove_cells_unique.retries", retries)
+
+    '''
+    Removes cells, keeping the solution unique, until the puzzle reaches the given technique grade
+    Cells are tried in random order; a removal that would make the puzzle harder than the target grade is
+    undone. A puzzle the technique solver can finish has exactly one solution, so the solution counter is only
+    needed for GRADE_EXPERT puzzles
+
+	Parameters:
+	grade is the target grade (GRADE_EASY, GRADE_MEDIUM, GRADE_HARD or GRADE_EXPERT, see sudoku_grader.py)
+
+	Return: boolean (whether at least removed_cells cells were cleared at the target grade; if not, a new
+	        board should be tried)
+    '''
+    def remove_cells_graded(self, grade):
+        cells = [(row, col) for row in range(self.row_length) for col in range(self.row_length)
+                 if self.board[row, col] != 0]
+        self.rng.shuffle(cells)
+        removed = 0
+        for row, col in cells:
+            num = self.board[row, col]
+            self.unplace(row, col)
+            current = grade_puzzle(self.board)
+            if current > grade or (current == GRADE_EXPERT and self.count_solutions(2, UNIQUE_CHECK_NODES) != 1):
+                self.place(row, col, num)
+                continue
+            removed += 1
+            if removed >= self.removed_cells and current == grade:
+                return True
+        return False
+
+    '''
+    Counts the solutions of the current board, stopping as soon as limit solutions are found
+    Uses the constraint-propagation solver (see sudoku_solver.py); the board is left unchanged
+
+	Parameters:
+	limit is the number of solutions after which counting stops (2 is enough to test uniqueness)
+	max_nodes is an optional limit on the search nodes; if it is reached, limit is returned
+
+	Return: int (the number of solutions found, at most limit)
+    '''
+    def count_solutions(self, limit=2, max_nodes=None):
+        return sudoku_solver.count_solutions(self.board, limit, max_nodes)
 
 
 '''
-DO NOT CHANGE
-Provided for students
 Given a number of rows and number of cells to remove, this function:
 1. creates a SudokuGenerator
 2. fills its values and saves this as the solved state
 3. removes the appropriate number of cells
-4. returns the representative 2D Python Lists of the board and solution
+4. returns the Board holding the puzzle, and optionally the solved state
 
 Parameters:
-size is the number of rows/columns of the board (9 for this project)
+size is the number of rows/columns of the board (9 for the game; any perfect square such as 16 or 25 works)
 removed is the number of cells to clear (set to 0)
-
-Return: list[list] (a 2D Python list to represent the board)
+unique is a boolean - if True, only cells that keep the solution unique are cleared
+grade is an optional technique grade (see sudoku_grader.py); if given, the puzzle is unique, has at least
+removed empty cells, and new boards are sampled until one reaches exactly this grade; after GRADE_ATTEMPTS
+boards without one, ValueError is raised (the target is usually out of reach, e.g. too many empty cells for
+an easy puzzle)
+rng is an optional seed (int) or random.Random instance; with a seed, the same arguments always return the
+same puzzle, so a puzzle can be stored as its seed and regenerated on demand
+base is an optional puzzle previously generated with the same size, removed, unique and grade; if given, the
+fast path returns a random symmetric variant of it (see sudoku_symmetry.py) instead of generating a new one;
+with with_solution, base is a (puzzle, solution) pair
+with_solution is a boolean - if True, the solution the puzzle was made from is returned too, so callers can
+check answers without solving the puzzle
+
+Return: Board (a flat board type, see board.py), or (puzzle, solution) Boards if with_solution is True
 '''
 
 
-def generate_sudoku(size, removed):
-    sudoku = SudokuGenerator(size, removed)
-    sudoku.fill_values()
-    board = sudoku.get_board()
-    sudoku.remove_cells()
+def generate_sudoku(size, removed, unique=False, grade=None, rng=None, base=None, with_solution=False):
+    rng = make_rng(rng)
+    if base is not None:
+        if not with_solution:
+            return random_variant(base, rng)
+        transform = random_transform(size, rng)
+        return transform.apply(base[0]), transform.apply(base[1])
+    if grade is not None:
+        for _ in range(GRADE_ATTEMPTS):
+            sudoku = SudokuGenerator(size, removed, rng)
+            sudoku.fill_values()
+            if sudoku.remove_cells_graded(grade):
+                break
+        else:
+            raise ValueError(f"no {GRADE_NAMES[grade]} puzzle with {removed} empty cells found in {GRADE_ATTEMPTS} "
+                             f"boards")
+    else:
+        sudoku = SudokuGenerator(size, removed, rng)
+        sudoku.fill_values()
+        sudoku.remove_cells(unique)
     board = sudoku.get_board()
+    if with_solution:
+        return board, sudoku.get_solution()
     return board
+
+
+instrumentation.instrument(SudokuGenerator, "fill_values", "fill_remaining", "fill_remaining_mrv",
+                           "remove_cells", "remove_cells_graded", "count_solutions")
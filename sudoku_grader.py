@@ -0,0 +1,159 @@
+"""
+Grades puzzles by the hardest solving technique a human needs, instead of by the number of empty cells.
+
+The grader replays a technique solver: at every step it applies the easiest technique that makes progress,
+and the grade is the hardest technique it had to use.
+
+    GRADE_EASY     hidden singles only (a digit that fits in only one cell of a row, column or box)
+    GRADE_MEDIUM   also naked singles (a cell with only one candidate left)
+    GRADE_HARD     also locked candidates (pointing/claiming) and naked pairs
+    GRADE_EXPERT   cannot be finished with the techniques above (needs chains or guessing)
+"""
+from board import Board, peer_lists, unit_tables
+from constant import *
+
+GRADE_NAMES = {GRADE_EASY: "easy", GRADE_MEDIUM: "medium", GRADE_HARD: "hard", GRADE_EXPERT: "expert"}
+
+
+class _TechniqueSolver:
+    """
+    Candidate-grid solver that only uses human techniques, easiest first.
+    """
+    def __init__(self, board: Board):
+        self.size = board.size
+        self.box_size = board.box_size
+        self.rows, self.cols, self.boxes, self.units = unit_tables(board.size)
+        self.box_units = self.units[2 * board.size:]
+        self.line_units = self.units[:2 * board.size]
+        self.peers = peer_lists(board.size)
+        self.values = [0] * (board.size * board.size)
+        all_digits = (1 << (board.size + 1)) - 2
+        self.candidates = [all_digits] * (board.size * board.size)
+        self.empty = board.size * board.size
+        for cell, num in enumerate(board.cells):
+            if num != 0:
+                self._place(cell, num)
+
+    def _place(self, cell: int, num: int):
+        bit = 1 << num
+        self.values[cell] = num
+        self.candidates[cell] = 0
+        self.empty -= 1
+        candidates = self.candidates
+        for peer in self.peers[cell]:
+            candidates[peer] &= ~bit
+
+    def _eliminate(self, cells, bit: int):
+        """
+        Remove a candidate from some cells.
+
+        :return: True if any candidate was removed
+        """
+        changed = False
+        candidates = self.candidates
+        for cell in cells:
+            if candidates[cell] & bit:
+                candidates[cell] &= ~bit
+                changed = True
+        return changed
+
+    def hidden_single(self):
+        for unit in self.units:
+            once = more = 0
+            for cell in unit:
+                candidates = self.candidates[cell]
+                more |= once & candidates
+                once |= candidates
+            hidden = once & ~more
+            if hidden:
+                bit = hidden & -hidden
+                for cell in unit:
+                    if self.candidates[cell] & bit:
+                        self._place(cell, bit.bit_length() - 1)
+                        return True
+        return False
+
+    def naked_single(self):
+        for cell, candidates in enumerate(self.candidates):
+            if candidates and candidates & (candidates - 1) == 0:
+                self._place(cell, candidates.bit_length() - 1)
+                return True
+        return False
+
+    def locked_candidates(self):
+        candidates = self.candidates
+        # Pointing: a digit confined to one row or column of a box is removed from the rest of that line
+        for box in self.box_units:
+            digits = 0
+            for cell in box:
+                digits |= candidates[cell]
+            while digits:
+                bit = digits & -digits
+                digits ^= bit
+                cells = [cell for cell in box if candidates[cell] & bit]
+                row = self.rows[cells[0]]
+                col = self.cols[cells[0]]
+                if all(self.rows[cell] == row for cell in cells):
+                    if self._eliminate((cell for cell in self.units[row] if cell not in box), bit):
+                        return True
+                elif all(self.cols[cell] == col for cell in cells):
+                    if self._eliminate((cell for cell in self.units[self.size + col] if cell not in box), bit):
+                        return True
+        # Claiming: a digit confined to one box within a row or column is removed from the rest of that box
+        for line in self.line_units:
+            digits = 0
+            for cell in line:
+                digits |= candidates[cell]
+            while digits:
+                bit = digits & -digits
+                digits ^= bit
+                cells = [cell for cell in line if candidates[cell] & bit]
+                box = self.boxes[cells[0]]
+                if all(self.boxes[cell] == box for cell in cells):
+                    if self._eliminate((cell for cell in self.box_units[box] if cell not in line), bit):
+                        return True
+        return False
+
+    def naked_pair(self):
+        candidates = self.candidates
+        for unit in self.units:
+            pairs = {}
+            for cell in unit:
+                mask = candidates[cell]
+                if mask.bit_count() == 2:
+                    other = pairs.get(mask)
+                    if other is None:
+                        pairs[mask] = cell
+                        continue
+                    rest = [peer for peer in unit if peer != cell and peer != other]
+                    if self._eliminate(rest, mask & -mask) | self._eliminate(rest, mask & (mask - 1)):
+                        return True
+        return False
+
+    def run(self):
+        """
+        Solve as far as the techniques allow.
+
+        :return: The grade of the hardest technique needed, or GRADE_EXPERT if they are not enough
+        """
+        techniques = ((GRADE_EASY, self.hidden_single), (GRADE_MEDIUM, self.naked_single),
+                      (GRADE_HARD, self.locked_candidates), (GRADE_HARD, self.naked_pair))
+        hardest = GRADE_EASY
+        while self.empty:
+            for level, technique in techniques:
+                if technique():
+                    hardest = max(hardest, level)
+                    break
+            else:
+                return GRADE_EXPERT
+        return hardest
+
+
+def grade(board: Board):
+    """
+    Grade a puzzle by the hardest technique needed to solve it.
+
+    :param board: The puzzle (0 for an empty cell); it is not modified. It should have a unique solution
+    :return: GRADE_EASY, GRADE_MEDIUM, GRADE_HARD or GRADE_EXPERT
+    """
+    return _TechniqueSolver(board).run()
@@ -0,0 +1,209 @@
+"""
+Asyncio server that lets many clients play Sudoku over TCP at the same time.
+
+Each connection plays one game. The protocol is line based: the client sends one command per line and the
+server answers each with one line, "OK ..." or "ERR <reason>".
+
+    NEW [difficulty [seed]]
+                         start a new game (easy/medium/hard or a number of removed cells); replies with the
+                         puzzle as 81 digits, 0 for an empty cell, and the puzzle's seed as 16 hex digits.
+                         Named difficulties are also graded by solving technique (see sudoku_grader.py).
+                         Sending the same difficulty and seed again replays the same puzzle
+    SELECT row col       select a cell (0-based), committing the temporary number of the previous cell
+    SET num              type a temporary number (0-9) into the selected cell
+    COMMIT               commit the temporary number of the selected cell
+    ERASE                erase the number committed in the selected cell
+    RESET                clear every number entered by the player (the moves can be redone)
+    UNDO                 take back the last change to the answer board; replies with "row col number" written
+                         back (or nothing if there is nothing to undo)
+    REDO                 make the last undone change again; replies like UNDO
+    HINT                 fill in one correct number; replies with "row col number" (or nothing if solved)
+    SOLVE                fill the answer board with the solution
+    BOARD                reply with the answer board as 81 digits
+    STATUS               reply with PLAYING, WIN, SOLVED (finished by SOLVE or a hint) or LOSE
+    QUIT                 close the connection
+
+Usage:  python sudoku_server.py [--host 127.0.0.1] [--port 8765] [--workers N]
+"""
+import argparse
+import asyncio
+import functools
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from sudoku_generator import generate_sudoku
+from game_session import GameSession
+from constant import *
+
+DIFFICULTIES = {"easy": EASY, "medium": MEDIUM, "hard": HARD}
+STATUS_NAMES = {None: "PLAYING", GAME_WIN: "WIN", GAME_SOLVED: "SOLVED", GAME_LOSE: "LOSE"}
+
+
+class SudokuServer:
+    """
+    Serves one GameSession per connection. Puzzle generation runs in an executor so a slow puzzle never
+    blocks the event loop, and returns the solution along with the puzzle. Moves run on the event loop and take
+    O(1) time, except RESET and SOLVE, which touch every cell once.
+    """
+    def __init__(self, executor=None):
+        """
+        :param executor: concurrent.futures executor used to generate puzzles (default: a process pool)
+        """
+        self.executor = executor if executor is not None else ProcessPoolExecutor()
+        self.active_sessions = 0  # Number of connected clients
+        self.total_sessions = 0  # Number of clients served since start
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765):
+        """
+        Start listening.
+
+        :param host: Interface to listen on
+        :param port: TCP port to listen on (0 picks a free port)
+        :return: The asyncio.Server
+        """
+        return await asyncio.start_server(self.handle_client, host, port, limit=1024)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Play one game with a connected client until it sends QUIT or disconnects.
+        """
+        self.active_sessions += 1
+        self.total_sessions += 1
+        session = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode("ascii", "replace").split()
+                if not parts:
+                    continue
+                command = parts[0].upper()
+                if command == "QUIT":
+                    break
+                if command == "NEW":
+                    try:
+                        removed = self._parse_difficulty(parts[1] if len(parts) > 1 else "medium")
+                        seed = self._parse_seed(parts[2]) if len(parts) > 2 else random.getrandbits(64)
+                    except ValueError as error:
+                        reply = f"ERR {error}"
+                    else:
+                        try:
+                            board, solution = await asyncio.get_running_loop().run_in_executor(
+                                self.executor, functools.partial(generate_sudoku, BOARD_ROWS, removed, True,
+                                                                 DIFFICULTY_GRADES.get(removed), seed,
+                                                                 with_solution=True))
+                        except ValueError as error:  # E.g. no puzzle of the grade within GRADE_ATTEMPTS boards
+                            reply = f"ERR {error}"
+                        else:
+                            session = GameSession(board, solution)
+                            reply = f"OK {board.to_string()} {seed:016x}"
+                else:
+                    reply = self.handle_move(session, command, parts[1:])
+                writer.write(reply.encode("ascii") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass  # Client went away or sent an overlong line
+        finally:
+            self.active_sessions -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass  # Already reset by the client
+
+    def handle_move(self, session: GameSession, command: str, args: list):
+        """
+        Apply one move command to a session, with the same rules as the pygame game.
+
+        :param session: The client's session, or None if no game was started
+        :param command: Upper-case command name
+        :param args: Command arguments
+        :return: The reply line, without the newline
+        """
+        if session is None:
+            return "ERR no game, send NEW first"
+        try:
+            if command == "SELECT":
+                row, col = (int(arg) for arg in args)
+                if not (0 <= row < BOARD_ROWS and 0 <= col < BOARD_COLS):
+                    return "ERR cell out of range"
+                session.select(row, col)
+            elif command == "SET":
+                num, = (int(arg) for arg in args)
+                if not 0 <= num <= BOARD_ROWS:
+                    return "ERR number out of range"
+                session.set_temp(num)
+            elif command == "COMMIT":
+                session.commit()
+            elif command == "ERASE":
+                session.erase()
+            elif command == "RESET":
+                session.reset()
+            elif command in ("HINT", "UNDO", "REDO"):
+                move = {"HINT": session.hint, "UNDO": session.undo, "REDO": session.redo}[command]()
+                session.clear_changes()
+                return "OK" if move is None else "OK {} {} {}".format(*move)
+            elif command == "SOLVE":
+                session.solve()
+            elif command == "BOARD":
+                return "OK " + session.answer_board.to_string()
+            elif command == "STATUS":
+                return "OK " + STATUS_NAMES[session.status()]
+            else:
+                return f"ERR unknown command {command}"
+        except ValueError:
+            return f"ERR bad arguments for {command}"
+        session.clear_changes()  # Nothing is redrawn on the server
+        return "OK"
+
+    @staticmethod
+    def _parse_difficulty(value: str):
+        """
+        Parse a difficulty given as a name (easy/medium/hard) or a number of removed cells.
+        """
+        if value.lower() in DIFFICULTIES:
+            return DIFFICULTIES[value.lower()]
+        try:
+            removed = int(value)
+        except ValueError:
+            raise ValueError("difficulty must be easy, medium, hard or a number of removed cells") from None
+        if not 0 <= removed < BOARD_ROWS * BOARD_COLS:
+            raise ValueError("difficulty out of range")
+        return removed
+
+    @staticmethod
+    def _parse_seed(value: str):
+        """
+        Parse a puzzle seed given as up to 16 hex digits.
+        """
+        try:
+            seed = int(value, 16)
+        except ValueError:
+            seed = -1
+        if not 0 <= seed < 1 << 64:
+            raise ValueError("seed must be up to 16 hex digits")
+        return seed
+
+
+async def serve(host: str, port: int, workers: int = None):
+    """
+    Run a server until cancelled.
+    """
+    with ProcessPoolExecutor(workers) as executor:
+        server = await SudokuServer(executor).start(host, port)
+        print(f"Serving Sudoku on {host}:{server.sockets[0].getsockname()[1]}")
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sudoku game server")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to listen on")
+    parser.add_argument("--workers", type=int, default=None, help="puzzle generation processes")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,213 @@
+"""
+Constraint-propagation Sudoku solver.
+
+Candidates are kept as bitmasks (bit n set = digit n is still possible) derived from per-row, per-column and
+per-box masks of used digits. Each search node first propagates naked singles (a cell with one candidate) and
+hidden singles (a digit with one possible cell in a unit), then branches on the empty cell with the fewest
+candidates (MRV).
+"""
+from board import Board, unit_tables
+
+
+class _Search:
+    """
+    Mutable search state over a flat list of cell values.
+    """
+    def __init__(self, board: Board, max_nodes: int = None):
+        self.size = board.size
+        self.nodes_left = max_nodes  # Search nodes left before giving up, None for no limit
+        self.gave_up = False  # True once the node limit was reached
+        self.rows, self.cols, self.boxes, self.units = unit_tables(board.size)
+        self.all_digits = (1 << (board.size + 1)) - 2
+        self.values = list(board.cells)
+        self.row_used = [0] * board.size
+        self.col_used = [0] * board.size
+        self.box_used = [0] * board.size
+        self.valid = True  # False if the givens already repeat a digit
+        for cell, num in enumerate(self.values):
+            if num != 0:
+                bit = 1 << num
+                if (self.row_used[self.rows[cell]] | self.col_used[self.cols[cell]] |
+                        self.box_used[self.boxes[cell]]) & bit:
+                    self.valid = False
+                self._mark(cell, num)
+
+    def _mark(self, cell: int, num: int):
+        bit = 1 << num
+        self.values[cell] = num
+        self.row_used[self.rows[cell]] |= bit
+        self.col_used[self.cols[cell]] |= bit
+        self.box_used[self.boxes[cell]] |= bit
+
+    def _unmark(self, cell: int):
+        bit = ~(1 << self.values[cell])
+        self.values[cell] = 0
+        self.row_used[self.rows[cell]] &= bit
+        self.col_used[self.cols[cell]] &= bit
+        self.box_used[self.boxes[cell]] &= bit
+
+    def candidates(self, cell: int):
+        """
+        :return: Bitmask of the digits that can go in an empty cell
+        """
+        return self.all_digits & ~(self.row_used[self.rows[cell]] | self.col_used[self.cols[cell]] |
+                                   self.box_used[self.boxes[cell]])
+
+    def propagate(self, placed: list):
+        """
+        Fill naked and hidden singles until none remain, appending every filled cell to placed.
+
+        :return: The empty cell with the fewest candidates and its candidates, (-1, 0) if the board is full,
+                 or None if a contradiction was found
+        """
+        # Local names for the hot loops
+        values, rows, cols, boxes = self.values, self.rows, self.cols, self.boxes
+        row_used, col_used, box_used = self.row_used, self.col_used, self.box_used
+        all_digits = self.all_digits
+        empty = [cell for cell in range(len(values)) if values[cell] == 0]
+        while True:
+            progress = False
+            best_cell, best_candidates, best_count = -1, 0, self.size + 1
+            for cell in empty:
+                if values[cell] != 0:
+                    continue
+                candidates = all_digits & ~(row_used[rows[cell]] | col_used[cols[cell]] | box_used[boxes[cell]])
+                if candidates == 0:
+                    return None
+                if candidates & (candidates - 1) == 0:  # Naked single
+                    self._mark(cell, candidates.bit_length() - 1)
+                    placed.append(cell)
+                    progress = True
+                elif not progress:
+                    count = candidates.bit_count()
+                    if count < best_count:
+                        best_cell, best_candidates, best_count = cell, candidates, count
+            if progress:
+                empty = [cell for cell in empty if values[cell] == 0]
+                continue
+
+            for unit in self.units:  # Hidden singles
+                once = more = used = 0
+                for cell in unit:
+                    num = values[cell]
+                    if num != 0:
+                        used |= 1 << num
+                        continue
+                    candidates = all_digits & ~(row_used[rows[cell]] | col_used[cols[cell]] | box_used[boxes[cell]])
+                    more |= once & candidates
+                    once |= candidates
+                if (once | used) != all_digits:
+                    return None  # Some digit has no place left in this unit
+                hidden = once & ~more
+                while hidden:
+                    bit = hidden & -hidden
+                    hidden ^= bit
+                    for cell in unit:
+                        if values[cell] == 0 and self.candidates(cell) & bit:
+                            self._mark(cell, bit.bit_length() - 1)
+                            placed.append(cell)
+                            progress = True
+                            break
+            if not progress:
+                return best_cell, best_candidates
+            empty = [cell for cell in empty if values[cell] == 0]
+
+    def search(self, limit: int, solutions: list, shuffle=None):
+        """
+        Depth-first search, collecting up to limit solutions (as lists of values) in solutions.
+
+        :param shuffle: Optional function that shuffles a list in place (such as random.shuffle); when given,
+                        the candidates of each branching cell are tried in random order
+        :return: Number of solutions found below this node
+        """
+        if self.nodes_left is not None:
+            if self.nodes_left <= 0:
+                self.gave_up = True
+                return 0
+            self.nodes_left -= 1
+        placed = []
+        result = self.propagate(placed)
+        found = 0
+        if result is not None:
+            cell, candidates = result
+            if cell < 0:
+                solutions.append(list(self.values))
+                found = 1
+            else:
+                digits = []
+                while candidates:
+                    bit = candidates & -candidates
+                    candidates ^= bit
+                    digits.append(bit.bit_length() - 1)
+                if shuffle is not None:
+                    shuffle(digits)
+                for num in digits:
+                    if found >= limit or self.gave_up:
+                        break
+                    self._mark(cell, num)
+                    found += self.search(limit - found, solutions, shuffle)
+                    self._unmark(cell)
+        for cell in reversed(placed):
+            self._unmark(cell)
+        return found
+
+
+def solve(board: Board, shuffle=None):
+    """
+    Solve a puzzle.
+
+    :param board: The puzzle (0 for an empty cell); it is not modified
+    :param shuffle: Optional function that shuffles a list in place (such as random.shuffle); when given, a
+                    random solution is returned instead of the first one, which turns the solver into a
+                    generator of full boards
+    :return: A new Board with the solution, or None if the puzzle has no solution
+    """
+    search = _Search(board)
+    solutions = []
+    if search.valid:
+        search.search(1, solutions, shuffle)
+    return Board(board.size, solutions[0]) if solutions else None
+
+
+def count_solutions(board: Board, limit: int = 2, max_nodes: int = None):
+    """
+    Count the solutions of a puzzle, stopping once limit solutions are found.
+
+    :param board: The puzzle (0 for an empty cell); it is not modified
+    :param limit: Number of solutions after which counting stops (2 is enough to test uniqueness)
+    :param max_nodes: Optional limit on the number of search nodes; if the search gives up, limit is returned,
+                      so a uniqueness test fails safe (the puzzle is treated as ambiguous)
+    :return: Number of solutions found, at most limit
+    """
+    search = _Search(board, max_nodes)
+    if not search.valid:
+        return 0
+    found = search.search(limit, [])
+    return limit if search.gave_up else found
+
+
+def hint(board: Board, solution: Board):
+    """
+    Suggest the next move for a partially filled board.
+
+    A committed number that disagrees with the solution is corrected first. Otherwise the empty cell with the
+    fewest candidates on the current board (the easiest one to deduce) is filled.
+
+    :param board: The player's current board
+    :param solution: The solution of the puzzle
+    :return: (row, col, number) of the suggested move, or None if the board is already solved
+    """
+    size = board.size
+    best_cell, best_count = -1, size + 1
+    search = _Search(board)
+    for cell, num in enumerate(board.cells):
+        if num == 0:
+            count = search.candidates(cell).bit_count()
+            if count < best_count:
+                best_cell, best_count = cell, count
+        elif num != solution.cells[cell]:
+            best_cell = cell
+            break
+    if best_cell < 0:
+        return None
+    return best_cell // size, best_cell % size, solution.cells[best_cell]
@@ -0,0 +1,85 @@
+"""
+Validity-preserving transformations that turn one puzzle into many equivalent ones.
+
+A transformation relabels the digits, permutes the bands (groups of box_size rows) and the rows inside each
+band, does the same for stacks and columns, and optionally transposes the board. Every such transformation
+maps a valid grid to a valid grid, so a puzzle's number of solutions, its empty-cell count and the techniques
+needed to solve it are all preserved. A 9x9 puzzle has 9! * 6^8 * 2 (about 1.2 * 10^12) variants, and
+deriving one takes about 40 microseconds instead of milliseconds for a full generation.
+"""
+import math
+import operator
+import random
+
+from board import Board
+
+
+class Transform:
+    """
+    One symmetry of the board: a cell permutation followed by a digit relabeling.
+    """
+    __slots__ = ("size", "cell_map", "digit_table", "_take")
+
+    def __init__(self, size: int, cell_map: list, digits: list):
+        """
+        :param size: Number of rows/columns of the board
+        :param cell_map: For each cell of the result, the cell of the original board it is copied from
+        :param digits: digits[n - 1] is the new label of digit n
+        """
+        self.size = size
+        self.cell_map = cell_map
+        self.digit_table = bytes([0] + digits) + bytes(255 - size)  # bytes.translate table, 0 stays empty
+        self._take = operator.itemgetter(*cell_map)
+
+    def apply(self, board: Board):
+        """
+        :param board: Board to transform (a puzzle or its solution); it is not modified
+        :return: A new Board
+        """
+        return Board(board.size, bytes(self._take(board.cells)).translate(self.digit_table))
+
+
+def _line_order(box_size: int, rng):
+    """
+    :return: A random order of the rows (or columns) that keeps every band (or stack) together
+    """
+    bands = list(range(box_size))
+    rng.shuffle(bands)
+    order = []
+    for band in bands:
+        lines = list(range(band * box_size, (band + 1) * box_size))
+        rng.shuffle(lines)
+        order += lines
+    return order
+
+
+def random_transform(size: int = 9, rng=random):
+    """
+    Pick a random symmetry of a size x size board.
+
+    :param size: Number of rows/columns of the board
+    :param rng: Source of randomness (a random.Random instance or the random module)
+    :return: Transform
+    """
+    box_size = math.isqrt(size)
+    rows = _line_order(box_size, rng)
+    cols = _line_order(box_size, rng)
+    if rng.random() < 0.5:
+        rows, cols = cols, rows
+        cell_map = [rows[col] * size + cols[row] for row in range(size) for col in range(size)]
+    else:
+        cell_map = [rows[row] * size + cols[col] for row in range(size) for col in range(size)]
+    digits = list(range(1, size + 1))
+    rng.shuffle(digits)
+    return Transform(size, cell_map, digits)
+
+
+def random_variant(board: Board, rng=random):
+    """
+    Derive a random equivalent puzzle.
+
+    :param board: A puzzle (or full grid); it is not modified
+    :param rng: Source of randomness (a random.Random instance or the random module)
+    :return: A new Board with the same number of solutions, empty cells and technique grade
+    """
+    return random_transform(board.size, rng).apply(board)